@@ -0,0 +1,97 @@
+import argparse
+import json
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+import config
+import forecast_engines
+import forecast_store
+import precompute_forecasts
+import price_store
+
+# Backtest dos motores de previsão sobre o histórico armazenado: para cada ativo, o histórico é cortado em
+# --folds pontos (espaçados de --horizon pregões no fim da série), cada motor prevê os --horizon pregões seguintes
+# e o resultado é comparado com o que de fato ocorreu. Mede o erro, a cobertura do intervalo e o tempo de ajuste.
+#
+#   python backtest_forecasts.py [--symbols PETR4.SA VALE3.SA] [--engines naive arima holt_winters prophet]
+#                                [--horizon 30] [--folds 3] [--max-fit-ms 1000] [--save] [--output resultado.json]
+#
+# Com --save, o motor de menor erro (entre os que respeitam --max-fit-ms) passa a ser o padrão de cada ativo no site.
+
+
+# Função para avaliar um motor em um ativo: erro percentual médio, erro quadrático, cobertura do intervalo e tempo de ajuste
+def evaluate(engine, df_treino, horizon, folds):
+    erros, quadrados, dentro, tempos = [], [], [], []
+    for fold in range(folds, 0, -1):
+        corte = len(df_treino) - fold * horizon
+        treino, real = df_treino.iloc[:corte], df_treino['y'].iloc[corte:corte + horizon].to_numpy()
+        inicio = time.perf_counter()
+        previsao = engine.forecast(treino, horizon)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        futuro = previsao[previsao['ds'] > treino['ds'].max()].head(len(real))
+        yhat = futuro['yhat'].to_numpy()
+        erros.append(np.abs(yhat - real) / np.abs(real))
+        quadrados.append((yhat - real) ** 2)
+        dentro.append((real >= futuro['yhat_lower'].to_numpy()) & (real <= futuro['yhat_upper'].to_numpy()))
+    return {
+        'mape': float(np.concatenate(erros).mean() * 100),
+        'rmse': float(np.sqrt(np.concatenate(quadrados).mean())),
+        'cobertura': float(np.concatenate(dentro).mean() * 100),
+        'fit_ms': float(np.median(tempos)),
+    }
+
+
+# Função para escolher o motor de cada ativo: o de menor erro entre os que ajustam dentro do limite de tempo
+def best_engines(result, max_fit_ms=None):
+    candidatos = result if max_fit_ms is None else result[result['fit_ms'] <= max_fit_ms]
+    return candidatos.loc[candidatos.groupby('symbol')['mape'].idxmin()].set_index('symbol')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara os motores de previsão no histórico armazenado.")
+    parser.add_argument('--symbols', nargs='+', help="ações a avaliar (padrão: disponíveis + favoritas)")
+    parser.add_argument('--engines', nargs='+', choices=list(forecast_engines.ENGINES), default=list(forecast_engines.ENGINES))
+    parser.add_argument('--horizon', type=int, default=30, help="dias úteis previstos em cada corte")
+    parser.add_argument('--folds', type=int, default=3, help="quantidade de cortes no fim da série")
+    parser.add_argument('--max-fit-ms', type=float, help="tempo máximo de ajuste para um motor ser escolhido")
+    parser.add_argument('--save', action='store_true', help="grava o melhor motor de cada ativo como padrão do site")
+    parser.add_argument('--output', help="arquivo JSON com os resultados")
+    args = parser.parse_args()
+
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    symbols = args.symbols or precompute_forecasts.get_universe()
+    linhas = []
+    for symbol in symbols:
+        df = price_store.load_history(symbol, start=config.DATA_INICIO)
+        if len(df) < (args.folds + 2) * args.horizon:
+            print(f"  {symbol}: histórico insuficiente")
+            continue
+        df_treino = df.reset_index()[['Date', 'Close']].rename(columns={"Date": 'ds', 'Close': 'y'})
+        for name in args.engines:
+            linhas.append({'symbol': symbol, 'engine': name, **evaluate(forecast_engines.get_engine(name), df_treino, args.horizon, args.folds)})
+
+    if not linhas:
+        return 1
+    result = pd.DataFrame(linhas)
+    print(result.set_index(['symbol', 'engine']).round(2).to_string())
+    print("\nMédia por motor:")
+    print(result.groupby('engine')[['mape', 'rmse', 'cobertura', 'fit_ms']].mean().round(2).to_string())
+
+    escolhidos = best_engines(result, args.max_fit_ms)
+    print("\nMelhor motor por ativo:")
+    print(escolhidos[['engine', 'mape', 'fit_ms']].round(2).to_string())
+    if args.save:
+        for symbol, row in escolhidos.iterrows():
+            forecast_store.save_engine_choice(symbol, row['engine'], row['mape'], row['fit_ms'])
+        print(f"{len(escolhidos)} escolhas gravadas")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(linhas, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
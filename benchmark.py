@@ -0,0 +1,223 @@
+import argparse
+import json
+import logging
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+import charts
+import config
+import forecast_cache
+import frame_cache
+import fundamentals_cache
+import indicators
+import market_data
+import price_store
+
+# Benchmarks de desempenho sem acessar o Yahoo, com a fonte sintética ou com arquivos gravados:
+#
+#   python benchmark.py [--sizes 5 100 1000] [--provider synthetic|replay] [--latency 0.05]
+#   python benchmark.py --record PETR4.SA VALE3.SA   (grava os arquivos da fonte replay a partir do Yahoo)
+#   python benchmark.py --startup [--runs 3]          (tempo de abertura do site em processos novos)
+#
+# Para cada tamanho de universo mede a carga inicial em lote, as cotações das favoritas, a renderização
+# da página de ações (dados, indicadores e gráfico), o ajuste do Prophet e o uso de memória.
+# A memória é medida em uma passada separada e sem cronômetro, pois o tracemalloc deixa mais lenta cada alocação.
+
+
+# Dependências cuja importação é medida no benchmark de abertura
+STARTUP_MODULES = ['streamlit', 'pandas', 'sqlalchemy', 'plotly.graph_objects', 'yfinance', 'prophet']
+
+# Código executado em um processo novo: abre a página de login como no primeiro acesso ao site
+LOGIN_SNIPPET = """
+import json, sys, time
+inicio = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+AppTest.from_file('site2.py', default_timeout=300).run()
+print(json.dumps({'s': time.perf_counter() - inicio, 'carregados': [m for m in %r if m in sys.modules]}))
+"""
+
+# Código executado em um processo novo: inicia os processos de previsão e carrega o Prophet neles
+WORKERS_SNIPPET = """
+import json, time
+import forecast_worker
+inicio = time.perf_counter()
+[future.result() for future in forecast_worker.prewarm()]
+print(json.dumps({'s': time.perf_counter() - inicio}))
+"""
+
+
+# Função para calcular um percentil simples de uma lista de tempos
+def percentile(values, q):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+# Função que reproduz o caminho de dados da página de ações para um ativo (sem o Streamlit)
+def render_stock_page(symbol):
+    hist = price_store.load_history(symbol, start=pd.Timestamp.today() - pd.DateOffset(years=5))
+    info = fundamentals_cache.get_info(symbol)
+    ind = indicators.get_indicators(symbol, hist)
+    fig, _ = charts.price_chart(symbol, hist, ind, '5A', list(indicators.OVERLAYS) + list(indicators.PANELS))
+    return len(fig.to_json()), info
+
+
+# Função para listar os ativos gravados para a fonte replay (vazia se a pasta ainda não existir)
+def recorded_symbols(fixtures_dir):
+    pasta = os.path.join(fixtures_dir, 'history')
+    if not os.path.isdir(pasta):
+        return []
+    return sorted(name[:-4] for name in os.listdir(pasta) if name.endswith('.csv'))
+
+
+# Função para listar os ativos usados em um tamanho de universo
+def universe(provider, size):
+    if isinstance(provider, market_data.ReplayProvider):
+        return recorded_symbols(provider.fixtures_dir)[:size]
+    # Prefixo por tamanho para que cada rodada comece com o armazenamento vazio
+    return [f"SYN{size}_{i:04d}" for i in range(size)]
+
+
+# Função para medir um tamanho de universo
+def bench_size(provider, size, render_sample, fit_sample):
+    symbols = universe(provider, size)
+    row = {'tickers': len(symbols)}
+
+    inicio = time.perf_counter()
+    price_store.refresh_many(symbols, force=True)
+    row['carga_lote_s'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    price_store.load_quotes(symbols)
+    row['cotacoes_ms'] = (time.perf_counter() - inicio) * 1000
+
+    amostra = symbols[:render_sample]
+    for rodada in ('fria', 'quente'):
+        tempos = []
+        for symbol in amostra:
+            inicio = time.perf_counter()
+            payload, _ = render_stock_page(symbol)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        row[f'render_{rodada}_p50_ms'] = percentile(tempos, 0.5)
+        row[f'render_{rodada}_p95_ms'] = percentile(tempos, 0.95)
+    row['grafico_kb'] = payload / 1024
+
+    tempos = []
+    for symbol in symbols[:fit_sample]:
+        df = price_store.load_history(symbol, start=config.DATA_INICIO)
+        df_treino = df.reset_index()[['Date', 'Close']].rename(columns={"Date": 'ds', 'Close': 'y'})
+        inicio = time.perf_counter()
+        forecast_cache.fit_model(df_treino, forecast_cache.PROPHET_CONFIG)
+        tempos.append(time.perf_counter() - inicio)
+    row['ajuste_medio_s'] = statistics.mean(tempos) if tempos else float('nan')
+
+    row['memoria_pico_mb'] = peak_memory(symbols, render_sample)
+    row['rss_max_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return row
+
+
+# Função para medir o pico de memória das cotações e da renderização da página de ações, sem cronometrar.
+# O cache de DataFrames é esvaziado antes, para que os históricos sejam lidos de novo como na passada fria.
+def peak_memory(symbols, render_sample):
+    frame_cache.discard(lambda key: True)
+    tracemalloc.start()
+    try:
+        price_store.load_quotes(symbols)
+        for symbol in symbols[:render_sample]:
+            render_stock_page(symbol)
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+# Função para executar um trecho de código em um processo Python novo e ler o JSON impresso na última linha
+def run_fresh(code):
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+# Função para medir a abertura do site: importação de cada dependência, página de login e processos de previsão
+def bench_startup(runs):
+    rows = []
+    for module in STARTUP_MODULES:
+        code = f"import json, time\ninicio = time.perf_counter()\nimport {module}\nprint(json.dumps({{'s': time.perf_counter() - inicio}}))"
+        rows.append({'etapa': f"import {module}", 'mediana_s': statistics.median(run_fresh(code)['s'] for _ in range(runs))})
+
+    logins = [run_fresh(LOGIN_SNIPPET % STARTUP_MODULES) for _ in range(runs)]
+    rows.append({
+        'etapa': "página de login",
+        'mediana_s': statistics.median(login['s'] for login in logins),
+        'dependências carregadas': ", ".join(logins[-1]['carregados']),
+    })
+    rows.append({'etapa': "processos de previsão", 'mediana_s': statistics.median(run_fresh(WORKERS_SNIPPET)['s'] for _ in range(runs))})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de desempenho com dados de mercado offline.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 100, 1000], help="tamanhos do universo de ações")
+    parser.add_argument('--provider', choices=['synthetic', 'replay'], default='synthetic')
+    parser.add_argument('--fixtures', default=config.FIXTURES_DIR, help="pasta dos arquivos gravados (fonte replay)")
+    parser.add_argument('--latency', type=float, default=0.0, help="atraso simulado por chamada (fonte replay)")
+    parser.add_argument('--render-sample', type=int, default=50, help="ativos renderizados por tamanho")
+    parser.add_argument('--fit-sample', type=int, default=3, help="modelos Prophet ajustados por tamanho")
+    parser.add_argument('--output', help="arquivo JSON com os resultados")
+    parser.add_argument('--record', nargs='*', metavar='SYMBOL', help="grava os arquivos da fonte replay e termina")
+    parser.add_argument('--startup', action='store_true', help="mede a abertura do site em processos novos e termina")
+    parser.add_argument('--runs', type=int, default=3, help="repetições de cada medida de abertura")
+    args = parser.parse_args()
+
+    if args.startup:
+        rows = bench_startup(args.runs)
+        print(pd.DataFrame(rows).set_index('etapa').round(3).fillna('').to_string())
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(rows, f, indent=2, ensure_ascii=False)
+        return
+
+    if args.record is not None:
+        symbols = args.record or config.AVAILABLE_ACTIONS
+        market_data.record_fixtures(market_data.YFinanceProvider(), symbols, args.fixtures)
+        print(f"{len(symbols)} ações gravadas em {args.fixtures}")
+        return
+
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    if args.provider == 'replay':
+        # Os arquivos da fonte replay não fazem parte do repositório: são gravados uma vez com --record
+        if not recorded_symbols(args.fixtures):
+            parser.error(f"nenhum histórico gravado em {os.path.join(args.fixtures, 'history')}; "
+                         f"grave os arquivos antes com: python benchmark.py --record [SYMBOL ...] --fixtures {args.fixtures}")
+        provider = market_data.ReplayProvider(args.fixtures, args.latency)
+    else:
+        provider = market_data.SyntheticProvider()
+    market_data.set_provider(provider)
+
+    # Bancos temporários, para não misturar os dados do benchmark com os do site
+    workdir = tempfile.mkdtemp(prefix='hawkeye-bench-')
+    price_store.PRICES_DB = os.path.join(workdir, 'prices.db')
+    fundamentals_cache.FUNDAMENTALS_DB = os.path.join(workdir, 'fundamentals.db')
+    config.METRICS_FILE = os.path.join(workdir, 'metrics.jsonl')
+
+    rows = []
+    for size in args.sizes:
+        print(f"Medindo {size} ações...")
+        rows.append(bench_size(provider, size, args.render_sample, args.fit_sample))
+
+    result = pd.DataFrame(rows).set_index('tickers')
+    print(result.round(2).to_string())
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.colors import qualitative
+from plotly.subplots import make_subplots
+
+import downsampling
+import indicators
+
+# Períodos que podem ser exibidos no gráfico de fechamento
+PERIODOS = {
+    '1M': pd.DateOffset(months=1),
+    '6M': pd.DateOffset(months=6),
+    '1A': pd.DateOffset(years=1),
+    '2A': pd.DateOffset(years=2),
+    '5A': pd.DateOffset(years=5),
+}
+
+# Intervalos do gráfico: diário (histórico com indicadores) ou as agregações mantidas em price_store
+INTERVALOS = {'Diário': None, 'Semanal': 'W', 'Mensal': 'M', 'Anual': 'Y'}
+
+
+# Função para montar o gráfico de fechamento com os indicadores escolhidos
+def build_price_figure(ticker, hist, ind, selected):
+    panels = [name for name in selected if name in indicators.PANELS]
+    scatter = downsampling.scatter_class(len(hist))
+    fig = make_subplots(rows=1 + len(panels), cols=1, shared_xaxes=True, vertical_spacing=0.03, row_heights=[3] + [1] * len(panels))
+    fig.add_trace(scatter(x=hist.index, y=hist['Close'], mode='lines', name='Fechamento Ajustado', line=dict(color='green')), row=1, col=1)
+
+    for name in selected:
+        for column in indicators.OVERLAYS.get(name, []):
+            fig.add_trace(scatter(x=ind.index, y=ind[column], mode='lines', name=column, line=dict(width=1)), row=1, col=1)
+
+    for row, name in enumerate(panels, start=2):
+        for column in indicators.PANELS[name]:
+            if column == 'macd_hist':
+                fig.add_trace(go.Bar(x=ind.index, y=ind[column], name=column, marker_color='gray'), row=row, col=1)
+            else:
+                fig.add_trace(scatter(x=ind.index, y=ind[column], mode='lines', name=column, line=dict(width=1)), row=row, col=1)
+        fig.update_yaxes(title_text=name, row=row, col=1)
+
+    fig.update_layout(
+        title=f'Preço de Fechamento - {ticker}',
+        template='plotly_dark',
+        height=450 + 150 * len(panels)
+    )
+    fig.update_yaxes(title_text='Preço de Fechamento Ajustado', row=1, col=1)
+    fig.update_xaxes(title_text='Data', row=1 + len(panels), col=1)
+    return fig
+
+
+# Função para montar o gráfico de velas de um intervalo agregado (semanal, mensal ou anual)
+def rollup_chart(ticker, rollup, intervalo):
+    fig = go.Figure(go.Candlestick(x=rollup.index, open=rollup['Open'], high=rollup['High'], low=rollup['Low'], close=rollup['Close'], name=intervalo))
+    fig.add_trace(go.Scatter(x=rollup.index, y=rollup['Mean'], mode='lines', name='Média do Período', line=dict(width=1)))
+    fig.update_layout(title=f'Preço {intervalo} - {ticker}', template='plotly_dark', height=450, xaxis_rangeslider_visible=False)
+    return fig
+
+
+# Função para montar o gráfico de comparação de vários ativos: séries em base 100, desempenho relativo à referência e
+# correlação móvel com ela, em um único gráfico com o eixo de datas compartilhado. Todas as séries são reduzidas nos
+# mesmos pregões (escolhidos por LTTB na série da referência) e cada ativo mantém a mesma cor nos três painéis.
+def comparison_chart(normalized, relative, correlation, reference):
+    keep = downsampling.lttb_indices(normalized.index, normalized[reference].ffill().bfill())
+    paineis = [
+        (normalized.iloc[keep], 'Base 100'),
+        (relative.iloc[keep], f'Relativo a {reference} (%)'),
+        (correlation.reindex(normalized.index).iloc[keep], 'Correlação móvel'),
+    ]
+    scatter = downsampling.scatter_class(len(keep))
+    fig = make_subplots(rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.04, row_heights=[3, 2, 2])
+    for row, (frame, titulo) in enumerate(paineis, start=1):
+        for i, symbol in enumerate(frame.columns):
+            # A referência não tem desempenho relativo nem correlação consigo mesma
+            if row > 1 and symbol == reference:
+                continue
+            cor = qualitative.Plotly[i % len(qualitative.Plotly)]
+            fig.add_trace(scatter(x=frame.index, y=frame[symbol], mode='lines', name=symbol, legendgroup=symbol,
+                                  showlegend=row == 1, line=dict(color=cor, width=1.5)), row=row, col=1)
+        fig.update_yaxes(title_text=titulo, row=row, col=1)
+    fig.update_layout(title='Comparação de Ações', template='plotly_dark', height=800, hovermode='x unified')
+    fig.update_xaxes(title_text='Data', row=3, col=1)
+    return fig
+
+
+# Função para montar o mapa de calor da correlação entre os ativos
+def correlation_heatmap(corr):
+    fig = go.Figure(go.Heatmap(z=corr.to_numpy(), x=list(corr.columns), y=list(corr.index), zmin=-1, zmax=1, colorscale='RdBu'))
+    fig.update_layout(title='Correlação dos retornos diários', template='plotly_dark', height=300 + 12 * len(corr))
+    return fig
+
+
+# Função para montar o gráfico das cotações do dia (modo ao vivo), com o fechamento anterior como referência.
+# Tem no máximo price_store.LIVE_MAX_TICKS pontos, independente do tamanho do histórico.
+def live_chart(ticker, times, prices, anterior=None):
+    fig = go.Figure(go.Scatter(x=times, y=prices, mode='lines+markers', name='Ao vivo', line=dict(color='orange'), marker=dict(size=4)))
+    if anterior is not None:
+        fig.add_hline(y=anterior, line=dict(color='gray', dash='dot'), annotation_text='Fechamento anterior')
+    fig.update_layout(title=f'Cotações do Dia - {ticker}', template='plotly_dark', height=250, margin=dict(t=40, b=20))
+    return fig
+
+
+# Função para montar o gráfico de fechamento do período escolhido, reduzido a no máximo downsampling.MAX_POINTS pontos.
+# Devolve o gráfico e a quantidade de pregões do período.
+def price_chart(ticker, hist, ind, periodo, selected):
+    visivel = hist.index >= hist.index[-1] - PERIODOS[periodo]
+    keep = downsampling.lttb_indices(hist.index[visivel], hist['Close'][visivel])
+    fig = build_price_figure(ticker, hist[visivel].iloc[keep], ind[visivel].iloc[keep], selected)
+    return fig, int(visivel.sum())
@@ -0,0 +1,37 @@
+import pandas as pd
+
+# Comparação de vários ativos: séries alinhadas em um calendário comum, normalizadas em uma data base,
+# com desempenho relativo e correlação móvel calculados de uma vez para todas as colunas.
+
+# Calendários possíveis para alinhar ativos de bolsas diferentes (B3 e NYSE têm feriados distintos)
+CALENDARIOS = {
+    'uniao': "Todos os pregões (B3 + NYSE)",
+    'comum': "Só os pregões em comum",
+}
+
+
+# Função para alinhar os fechamentos em um calendário comum. Na união dos pregões, o feriado de uma bolsa repete
+# o último fechamento do ativo; nos pregões em comum, ficam só os dias em que todos os ativos negociaram.
+def align(closes, calendario='uniao'):
+    closes = closes.sort_index().dropna(axis=1, how='all')
+    if calendario == 'comum':
+        return closes.dropna()
+    # Antes do primeiro pregão de um ativo não há o que repetir, e o valor continua vazio
+    return closes.ffill()
+
+
+# Função para normalizar as séries em base 100 no primeiro pregão a partir da data base
+def normalize(aligned, base_date):
+    aligned = aligned[aligned.index >= pd.Timestamp(base_date)]
+    return aligned / aligned.bfill().iloc[0] * 100
+
+
+# Função para calcular o desempenho de cada ativo em relação a uma referência (em %)
+def relative_performance(normalized, reference):
+    return (normalized.div(normalized[reference], axis=0) - 1) * 100
+
+
+# Função para calcular a correlação móvel dos retornos diários de cada ativo com a referência
+def rolling_correlation(aligned, reference, window=60):
+    returns = aligned.pct_change(fill_method=None)
+    return returns.rolling(window, min_periods=window // 2).corr(returns[reference])
@@ -0,0 +1,50 @@
+import os
+
+# Configuração do banco de dados de usuários
+DATABASE_URL = "sqlite:///users.db"
+
+# Data a partir da qual o histórico de preços é armazenado
+DATA_INICIO = '2017-01-01'
+
+# Ações disponíveis para consulta e favoritos
+AVAILABLE_ACTIONS = ["BBAS3.SA", "PETR4.SA", "VALE3.SA", "AAPL", "TSLA"]
+
+# Horizonte máximo (em dias úteis) da previsão exibida na página de ações
+FORECAST_HORIZON = 90
+# Motor de previsão padrão: "prophet", "holt_winters", "arima" ou "naive" (ver forecast_engines)
+FORECAST_ENGINE = os.environ.get("HAWKEYE_FORECAST_ENGINE", "prophet")
+# Motor padrão da página da carteira: um motor de milissegundos, para que dezenas de favoritas fiquem prontas na hora
+PORTFOLIO_FORECAST_ENGINE = os.environ.get("HAWKEYE_PORTFOLIO_ENGINE", "holt_winters")
+
+# Pool de conexões do banco de usuários (compartilhado por todas as sessões do Streamlit)
+DB_POOL_SIZE = 10
+DB_MAX_OVERFLOW = 20
+DB_POOL_TIMEOUT = 30
+
+# Arquivo onde as medições de desempenho de cada página são gravadas (uma linha JSON por registro)
+METRICS_FILE = "metrics.jsonl"
+# Tamanho máximo do arquivo de métricas: ao passar dele, o arquivo vira METRICS_FILE + ".1" (substituindo o anterior)
+METRICS_MAX_BYTES = int(os.environ.get("HAWKEYE_METRICS_MAX_MB", "20")) * 2**20
+
+# Usuários que podem ver o painel de desempenho (separados por vírgula na variável de ambiente).
+# Não há padrão: o cadastro é aberto, então qualquer nome fixo poderia ser registrado por outra pessoa.
+ADMIN_USERS = [u for u in os.environ.get("HAWKEYE_ADMINS", "").split(",") if u]
+
+# Fonte dos dados de mercado: "yfinance", "replay" (arquivos gravados em FIXTURES_DIR) ou "synthetic"
+MARKET_DATA_PROVIDER = os.environ.get("HAWKEYE_DATA_PROVIDER", "yfinance")
+FIXTURES_DIR = os.environ.get("HAWKEYE_FIXTURES_DIR", "fixtures")
+# Atraso (em segundos) simulado em cada chamada da fonte "replay"
+REPLAY_LATENCY = float(os.environ.get("HAWKEYE_REPLAY_LATENCY", "0"))
+
+# Fonte das notícias: "yfinance" ou "file" (lista de artigos em NEWS_FILE, para uso sem rede)
+NEWS_SOURCE = os.environ.get("HAWKEYE_NEWS_SOURCE", "yfinance")
+NEWS_FILE = os.environ.get("HAWKEYE_NEWS_FILE", os.path.join(FIXTURES_DIR, "news.json"))
+
+# Memória máxima (em MB) do cache de DataFrames compartilhado entre as sessões
+FRAME_CACHE_BUDGET_MB = int(os.environ.get("HAWKEYE_FRAME_CACHE_MB", "256"))
+
+# Modo ao vivo: intervalo (em segundos) entre duas cotações e tempo sem acesso após o qual um ativo deixa de ser consultado
+LIVE_POLL_INTERVAL = float(os.environ.get("HAWKEYE_LIVE_POLL", "5"))
+LIVE_IDLE_TIMEOUT = 60
+# Intervalo (em segundos) com que a página da carteira confere as previsões do lote ainda em andamento
+PORTFOLIO_POLL_INTERVAL = 2
@@ -0,0 +1,115 @@
+from contextlib import contextmanager
+
+from sqlalchemy import Column, ForeignKey, Index, Integer, String, create_engine, event, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import declarative_base, relationship, scoped_session, sessionmaker
+from sqlalchemy.pool import QueuePool
+
+import config
+import perf
+
+Base = declarative_base()
+
+# Configuração do banco de dados: um pool de conexões compartilhado por todas as sessões do Streamlit
+engine = create_engine(
+    config.DATABASE_URL,
+    poolclass=QueuePool,
+    pool_size=config.DB_POOL_SIZE,
+    max_overflow=config.DB_MAX_OVERFLOW,
+    pool_timeout=config.DB_POOL_TIMEOUT,
+    pool_pre_ping=True,
+    connect_args={'check_same_thread': False, 'timeout': 30},
+)
+
+
+# WAL permite leituras concorrentes enquanto outra conexão escreve
+@event.listens_for(engine, 'connect')
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+# Definição da tabela de usuários
+class User(Base):
+    __tablename__ = 'users'
+    id = Column(Integer, primary_key=True)
+    username = Column(String, unique=True, nullable=False)
+    password = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    favorites = relationship("Favorite", back_populates="user")
+
+class Favorite(Base):
+    __tablename__ = 'favorites'
+    __table_args__ = (Index('ux_favorites_user_symbol', 'user_id', 'symbol', unique=True),)
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'))
+    symbol = Column(String, nullable=False)
+    user = relationship("User", back_populates="favorites")
+
+
+# Uma sessão por thread (cada sessão do Streamlit roda o script na sua própria thread)
+Session = scoped_session(sessionmaker(bind=engine, expire_on_commit=False))
+
+
+# Função para abrir uma sessão com commit/rollback automático, devolvendo a conexão ao pool no final
+@contextmanager
+def session_scope():
+    session = Session()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        Session.remove()
+
+
+# Função para criar as tabelas e o índice único de favoritos em bancos criados antes dele
+def init_db():
+    Base.metadata.create_all(engine)
+    with session_scope() as session:
+        # Remove favoritos duplicados, que impediriam a criação do índice único
+        keep = select(func.min(Favorite.id)).group_by(Favorite.user_id, Favorite.symbol)
+        session.query(Favorite).filter(Favorite.id.not_in(keep)).delete(synchronize_session=False)
+    for index in Favorite.__table__.indexes:
+        index.create(engine, checkfirst=True)
+
+
+# Função para adicionar um usuário ao banco de dados
+def add_user(username, password, name):
+    with session_scope() as session:
+        stmt = insert(User).values(username=username, password=password, name=name)
+        result = session.execute(stmt.on_conflict_do_nothing(index_elements=['username']))
+        return result.rowcount == 1
+
+
+# Função para buscar o usuário com o login e a senha informados
+def find_user(username, password):
+    with perf.span('db.check_login'), session_scope() as session:
+        return session.query(User).filter_by(username=username, password=password).first()
+
+
+# Função para adicionar uma ação favorita (ignorada se já estiver nas favoritas)
+def add_favorite(user_id, symbol):
+    with session_scope() as session:
+        stmt = insert(Favorite).values(user_id=user_id, symbol=symbol)
+        session.execute(stmt.on_conflict_do_nothing(index_elements=['user_id', 'symbol']))
+
+
+# Função para obter as ações favoritadas pelo usuário
+def get_favorites(user_id):
+    with perf.span('db.get_favorites'), session_scope() as session:
+        return session.query(Favorite).filter_by(user_id=user_id).order_by(Favorite.id).all()
+
+
+# Função para obter todas as ações favoritadas por algum usuário
+def get_all_favorite_symbols():
+    with session_scope() as session:
+        return [symbol for (symbol,) in session.query(Favorite.symbol).distinct().order_by(Favorite.symbol)]
+
+
+init_db()
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Redução de pontos das séries antes de enviá-las ao navegador
+MAX_POINTS = 1500
+# A partir desta quantidade de pontos, os traços usam WebGL (Scattergl)
+WEBGL_THRESHOLD = 1000
+
+
+# Função para escolher os índices a manter com o algoritmo Largest-Triangle-Three-Buckets (LTTB),
+# que preserva picos e vales da série
+def lttb_indices(x, y, threshold=MAX_POINTS):
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = pd.Index(x)
+    x = (x.asi8 if isinstance(x, pd.DatetimeIndex) else x.to_numpy()).astype(np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # O primeiro e o último ponto são sempre mantidos; os demais são divididos em threshold - 2 grupos
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+# Função para reduzir um DataFrame indexado por data, escolhendo os pontos pela coluna informada
+def downsample(df, column, threshold=MAX_POINTS):
+    return df.iloc[lttb_indices(df.index, df[column], threshold)]
+
+
+# Função para escolher o tipo de traço de linha conforme a quantidade de pontos
+def scatter_class(n_points):
+    return go.Scattergl if n_points > WEBGL_THRESHOLD else go.Scatter
+
+
+# Função para medir o tamanho (em bytes) do JSON que o gráfico envia ao navegador
+def payload_size(fig):
+    return len(fig.to_json().encode('utf-8'))
+
+
+# Função para descrever o tamanho do gráfico enviado
+def describe_payload(fig, original_points):
+    sent_points = max((len(trace.x) for trace in fig.data if trace.x is not None), default=0)
+    return f"{sent_points} de {original_points} pontos enviados ({payload_size(fig) / 1024:.0f} KB)"
@@ -0,0 +1,84 @@
+import threading
+from collections import OrderedDict
+
+import perf
+
+# Configuração do cache de modelos de previsão (compartilhado entre sessões)
+MAX_MODELS = 32
+PROPHET_CONFIG = {}
+
+_lock = threading.Lock()
+# (símbolo, data do último pregão, configuração) -> modelo ajustado, em ordem de uso
+_models = OrderedDict()
+# (símbolo, configuração) -> último modelo ajustado, usado como ponto de partida do próximo ajuste
+_latest = {}
+
+
+# Função para transformar a configuração do modelo em uma chave imutável
+def config_key(config):
+    return tuple(sorted(config.items()))
+
+
+# Função para extrair os parâmetros de um modelo ajustado no formato aceito por Prophet.fit(init=...)
+def warm_start_params(model):
+    params = {}
+    for name in ['k', 'm', 'sigma_obs']:
+        params[name] = model.params[name][0][0]
+    for name in ['delta', 'beta']:
+        params[name] = model.params[name][0]
+    return params
+
+
+# Função para ajustar um modelo, partindo dos parâmetros do ajuste anterior quando houver
+def fit_model(df_treino, config, previous=None):
+    init = warm_start_params(previous) if previous is not None else None
+    return fit_with_params(df_treino, config, init)
+
+
+# Função para ajustar um modelo a partir de parâmetros iniciais já extraídos (ou do zero)
+def fit_with_params(df_treino, config, init=None):
+    # O Prophet (com o cmdstanpy) só é carregado no primeiro ajuste, para não atrasar a abertura do site
+    from prophet import Prophet
+    modelo = Prophet(**config)
+    with perf.span('Prophet.fit', rows=len(df_treino), warm_start=init is not None):
+        if init is not None:
+            modelo.fit(df_treino, init=init)
+        else:
+            modelo.fit(df_treino)
+    return modelo
+
+
+# Função para buscar no cache o modelo ajustado até uma data
+def lookup(symbol, last_date, config):
+    key = (symbol, last_date, config_key(config))
+    with _lock:
+        if key in _models:
+            _models.move_to_end(key)
+            perf.count('forecast_cache.hit')
+            return _models[key]
+    perf.count('forecast_cache.miss')
+    return None
+
+
+# Função para obter o último modelo de um ativo anterior a uma data, para reaproveitar no próximo ajuste
+def previous_model(symbol, last_date, config):
+    with _lock:
+        previous = _latest.get((symbol, config_key(config)))
+    # O reaproveitamento só vale para históricos mais antigos do mesmo ativo
+    if previous is not None and previous.history['ds'].max() >= last_date:
+        return None
+    return previous
+
+
+# Função para guardar um modelo ajustado no cache, descartando os menos usados
+def store(symbol, last_date, config, modelo):
+    base_key = (symbol, config_key(config))
+    key = (symbol, last_date, base_key[1])
+    with _lock:
+        _models[key] = modelo
+        _models.move_to_end(key)
+        latest = _latest.get(base_key)
+        if latest is None or latest.history['ds'].max() <= last_date:
+            _latest[base_key] = modelo
+        while len(_models) > MAX_MODELS:
+            _models.popitem(last=False)
@@ -0,0 +1,220 @@
+from abc import ABC, abstractmethod
+from itertools import product
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+import config
+import forecast_cache
+import forecast_store
+import frame_cache
+import perf
+
+# Motores de previsão. Todos recebem o histórico no formato do Prophet (colunas ds e y) e devolvem a previsão
+# no mesmo formato do Prophet: ds, yhat, yhat_lower, yhat_upper e os componentes disponíveis (trend, weekly),
+# com os valores ajustados no histórico seguidos dos n_days dias úteis previstos.
+# O Prophet é o mais preciso e leva segundos; os demais são calculados com NumPy em milissegundos.
+
+# Quantidade de pregões em uma semana (período da sazonalidade semanal)
+PERIODO = 5
+# Quantil da normal do intervalo de previsão (80%, o mesmo do Prophet)
+Z_INTERVALO = NormalDist().inv_cdf(0.9)
+
+
+# Função para montar a previsão no formato do Prophet a partir dos valores ajustados, previstos e do desvio de cada dia previsto
+def _previsao(ds, ajustado, previsto, desvio, n_days, sigma, **componentes):
+    futuro = pd.bdate_range(ds.iloc[-1] + pd.Timedelta(days=1), periods=n_days)
+    yhat = np.concatenate([ajustado, previsto])
+    margem = Z_INTERVALO * np.concatenate([np.full(len(ajustado), sigma), desvio])
+    previsao = pd.DataFrame({
+        'ds': np.concatenate([ds.to_numpy(), futuro.to_numpy()]),
+        'yhat': yhat,
+        'yhat_lower': yhat - margem,
+        'yhat_upper': yhat + margem,
+    })
+    for name, values in componentes.items():
+        previsao[name] = values
+    return previsao
+
+
+# Interface comum dos motores de previsão
+class ForecastEngine(ABC):
+    name = 'base'
+    label = ''
+    # Quantidade mínima de pregões no histórico para o motor conseguir ajustar o modelo
+    min_rows = 2
+
+    # Previsão dos n_days dias úteis seguintes ao histórico df_treino
+    @abstractmethod
+    def forecast(self, df_treino, n_days):
+        pass
+
+
+# Prophet: tendência com pontos de mudança e sazonalidades semanal e anual (ajuste em segundos)
+class ProphetEngine(ForecastEngine):
+    name = 'prophet'
+    label = 'Prophet'
+
+    def forecast(self, df_treino, n_days):
+        modelo = forecast_cache.fit_model(df_treino, forecast_cache.PROPHET_CONFIG)
+        return modelo.predict(modelo.make_future_dataframe(periods=n_days, freq='B'))
+
+
+# Holt-Winters aditivo com tendência amortecida e sazonalidade semanal. Os parâmetros são escolhidos em uma grade,
+# com todas as combinações calculadas ao mesmo tempo (um vetor por parâmetro) sobre os últimos `window` pregões.
+class HoltWintersEngine(ForecastEngine):
+    name = 'holt_winters'
+    label = 'Holt-Winters'
+    # Duas semanas para o estado inicial e ao menos um pregão depois delas para medir o erro
+    min_rows = 2 * PERIODO + 1
+
+    def __init__(self, window=500, alphas=(0.2, 0.5, 0.8, 0.95, 0.99), betas=(0.01, 0.05, 0.2), gammas=(0.01, 0.1), phis=(0.9, 0.98, 1.0)):
+        self.window = window
+        self.grid = np.array(list(product(alphas, betas, gammas, phis))).T
+
+    def forecast(self, df_treino, n_days):
+        df_treino = df_treino.tail(self.window)
+        y = df_treino['y'].to_numpy(dtype=float)
+        m = PERIODO
+        alpha, beta, gamma, phi = self.grid
+
+        # Estado inicial: nível e sazonalidade da primeira semana, tendência entre as duas primeiras
+        nivel = np.full(alpha.shape, y[:m].mean())
+        tendencia = np.full(alpha.shape, (y[m:2 * m].mean() - y[:m].mean()) / m)
+        sazonal = np.tile(y[:m] - y[:m].mean(), (len(alpha), 1))
+        ajustado = np.empty((len(y), len(alpha)))
+        base = np.empty((len(y), len(alpha)))
+        for t in range(len(y)):
+            s = sazonal[:, t % m]
+            base[t] = nivel + phi * tendencia
+            ajustado[t] = base[t] + s
+            novo_nivel = alpha * (y[t] - s) + (1 - alpha) * base[t]
+            tendencia = beta * (novo_nivel - nivel) + (1 - beta) * phi * tendencia
+            sazonal[:, t % m] = gamma * (y[t] - base[t]) + (1 - gamma) * s
+            nivel = novo_nivel
+
+        erros = y[2 * m:, None] - ajustado[2 * m:]
+        melhor = int(np.argmin((erros ** 2).sum(axis=0)))
+        a, b, g, f = (param[melhor] for param in self.grid)
+        sigma = erros[:, melhor].std()
+
+        h = np.arange(1, n_days + 1)
+        amortecimento = np.cumsum(f ** h)
+        sazonal_futura = sazonal[melhor, (len(y) + h - 1) % m]
+        previsto = nivel[melhor] + amortecimento * tendencia[melhor] + sazonal_futura
+        # Variância do erro a h passos: cada passo anterior soma o efeito do choque sobre nível, tendência e sazonalidade
+        c = a * (1 + b * amortecimento[:-1]) + g * (h[:-1] % m == 0)
+        desvio = sigma * np.sqrt(1 + np.concatenate([[0], np.cumsum(c ** 2)]))
+        return _previsao(
+            df_treino['ds'], ajustado[:, melhor], previsto, desvio, n_days, sigma,
+            trend=np.concatenate([base[:, melhor], nivel[melhor] + amortecimento * tendencia[melhor]]),
+            weekly=np.concatenate([ajustado[:, melhor] - base[:, melhor], sazonal_futura]),
+        )
+
+
+# ARIMA(p, 1, 0) com deriva: autorregressão das variações diárias ajustada por mínimos quadrados (matriz de defasagens),
+# com a ordem p escolhida pelo AIC
+class ArimaEngine(ForecastEngine):
+    name = 'arima'
+    label = 'ARIMA'
+
+    def __init__(self, max_p=5):
+        self.max_p = max_p
+        # Variações suficientes para que a maior ordem tenha mais resíduos do que coeficientes
+        self.min_rows = 2 * max_p + 3
+
+    def forecast(self, df_treino, n_days):
+        y = df_treino['y'].to_numpy(dtype=float)
+        d = np.diff(y)
+        melhor = None
+        for p in range(1, self.max_p + 1):
+            defasagens = np.lib.stride_tricks.sliding_window_view(d[:-1], p)[:, ::-1]
+            X = np.column_stack([np.ones(len(defasagens)), defasagens])
+            coef, *_ = np.linalg.lstsq(X, d[p:], rcond=None)
+            residuos = d[p:] - X @ coef
+            sigma2 = residuos @ residuos / len(residuos)
+            aic = len(residuos) * np.log(sigma2) + 2 * (p + 1)
+            if melhor is None or aic < melhor[0]:
+                melhor = (aic, p, coef, X @ coef, sigma2)
+        _, p, coef, d_ajustado, sigma2 = melhor
+        constante, phi = coef[0], coef[1:]
+
+        # Previsão recursiva das variações e acumulação a partir do último preço
+        ultimas = list(d[-p:][::-1])
+        d_previsto = np.empty(n_days)
+        for h in range(n_days):
+            d_previsto[h] = constante + phi @ np.array(ultimas[:p])
+            ultimas.insert(0, d_previsto[h])
+        previsto = y[-1] + np.cumsum(d_previsto)
+
+        # Pesos psi da autorregressão; o erro do preço a h passos acumula os pesos das variações
+        psi = np.zeros(n_days)
+        psi[0] = 1
+        for j in range(1, n_days):
+            psi[j] = sum(phi[i] * psi[j - 1 - i] for i in range(min(j, p)))
+        desvio = np.sqrt(sigma2 * np.cumsum(np.cumsum(psi) ** 2))
+
+        ajustado = y[p:-1] + d_ajustado
+        return _previsao(
+            df_treino['ds'].iloc[p + 1:], ajustado, previsto, desvio, n_days, np.sqrt(sigma2),
+            trend=np.concatenate([ajustado, previsto]),
+        )
+
+
+# Sazonal ingênuo: repete os valores da última semana; serve de referência mínima para os demais motores
+class SeasonalNaiveEngine(ForecastEngine):
+    name = 'naive'
+    label = 'Sazonal ingênuo'
+    # Uma semana para repetir e ao menos um pregão depois dela para medir o erro
+    min_rows = PERIODO + 1
+
+    def forecast(self, df_treino, n_days):
+        y = df_treino['y'].to_numpy(dtype=float)
+        m = PERIODO
+        ajustado = y[:-m]
+        sigma = (y[m:] - ajustado).std()
+        h = np.arange(1, n_days + 1)
+        previsto = y[len(y) - m + (h - 1) % m]
+        desvio = sigma * np.sqrt((h - 1) // m + 1)
+        return _previsao(df_treino['ds'].iloc[m:], ajustado, previsto, desvio, n_days, sigma, trend=np.concatenate([ajustado, previsto]))
+
+
+ENGINES = {
+    'prophet': ProphetEngine,
+    'holt_winters': HoltWintersEngine,
+    'arima': ArimaEngine,
+    'naive': SeasonalNaiveEngine,
+}
+
+_engines = {}
+
+
+# Função para obter um motor de previsão pelo nome (padrão: config.FORECAST_ENGINE)
+def get_engine(name=None):
+    name = name or config.FORECAST_ENGINE
+    if name not in _engines:
+        _engines[name] = ENGINES[name]()
+    return _engines[name]
+
+
+# Função para obter o motor de um ativo: o escolhido pelo backtest (backtest_forecasts.py --save) ou o padrão
+def default_engine(symbol):
+    return forecast_store.load_engine_choice(symbol) or config.FORECAST_ENGINE
+
+
+# Função para prever um ativo com um motor rápido, calculando no horizonte máximo e guardando o resultado no
+# cache compartilhado (frame_cache). O Prophet segue pelo pool de processos (forecast_worker).
+def predict(name, symbol, df_treino, n_days):
+    engine = get_engine(name)
+    if len(df_treino) < engine.min_rows:
+        raise ValueError(f"{symbol}: histórico curto demais para o {engine.label} ({len(df_treino)} de {engine.min_rows} pregões)")
+    last_date = df_treino['ds'].max()
+    horizonte = max(n_days, config.FORECAST_HORIZON)
+
+    def calcular():
+        with perf.span(f'{name}.forecast', symbol=symbol, rows=len(df_treino)):
+            return engine.forecast(df_treino, horizonte)
+
+    previsao = frame_cache.get_or_load(('engine_forecast', name, symbol, last_date, horizonte), calcular)
+    return forecast_store.slice_forecast(previsao, last_date, n_days)
@@ -0,0 +1,55 @@
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+
+import downsampling
+
+# Funções para desenhar previsões a partir do DataFrame da previsão, sem precisar do modelo ajustado
+# (servem tanto para as previsões pré-calculadas pelo processamento em lote quanto para as calculadas na hora).
+# O histórico é reduzido com LTTB; os dias previstos são sempre enviados completos.
+
+DIAS_SEMANA = ['Seg', 'Ter', 'Qua', 'Qui', 'Sex', 'Sáb', 'Dom']
+
+
+# Função para desenhar os valores reais, a previsão e o intervalo de confiança
+def plot_forecast(df_treino, previsao, max_points=downsampling.MAX_POINTS):
+    real = df_treino.set_index('ds')
+    real = downsampling.downsample(real, 'y', max_points).reset_index()
+
+    futuro = previsao['ds'] > df_treino['ds'].max()
+    ajustado = previsao[~futuro].set_index('ds')
+    ajustado = downsampling.downsample(ajustado, 'yhat', max_points).reset_index()
+    previsao = pd.concat([ajustado, previsao[futuro]], ignore_index=True)
+
+    scatter = downsampling.scatter_class(max(len(real), len(previsao)))
+    fig = go.Figure()
+    fig.add_trace(scatter(x=previsao['ds'], y=previsao['yhat_lower'], mode='lines', line=dict(width=0), hoverinfo='skip', showlegend=False))
+    fig.add_trace(scatter(x=previsao['ds'], y=previsao['yhat_upper'], mode='lines', line=dict(width=0), fill='tonexty', fillcolor='rgba(0, 114, 178, 0.2)', name='Intervalo'))
+    fig.add_trace(scatter(x=previsao['ds'], y=previsao['yhat'], mode='lines', line=dict(color='#0072B2', width=2), name='Previsto'))
+    fig.add_trace(scatter(x=real['ds'], y=real['y'], mode='markers', marker=dict(color='black', size=4), name='Real'))
+    fig.update_layout(xaxis_title='ds', yaxis_title='y', showlegend=False, height=600)
+    return fig
+
+
+# Função para desenhar a tendência e as sazonalidades semanal e anual
+def plot_components(previsao):
+    components = [name for name in ['trend', 'weekly', 'yearly'] if name in previsao.columns]
+    fig = make_subplots(rows=len(components), cols=1)
+
+    for row, name in enumerate(components, start=1):
+        if name == 'trend':
+            tendencia = downsampling.downsample(previsao.set_index('ds'), 'trend').reset_index()
+            x, y = tendencia['ds'], tendencia['trend']
+        elif name == 'weekly':
+            # A sazonalidade é periódica: a média por dia da semana reconstrói o perfil
+            perfil = previsao.groupby(previsao['ds'].dt.dayofweek)['weekly'].mean()
+            x, y = [DIAS_SEMANA[d] for d in perfil.index], perfil.values
+        else:
+            ultimo_ano = previsao[previsao['ds'] > previsao['ds'].max() - pd.DateOffset(years=1)]
+            perfil = ultimo_ano.sort_values('ds')
+            x, y = perfil['ds'].dt.strftime('%d/%m'), perfil['yearly']
+        fig.add_trace(go.Scatter(x=x, y=y, mode='lines', line=dict(color='#0072B2', width=2), name=name), row=row, col=1)
+        fig.update_yaxes(title_text=name, row=row, col=1)
+
+    fig.update_layout(showlegend=False, height=200 * len(components) + 100)
+    return fig
@@ -0,0 +1,132 @@
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+import frame_cache
+
+# Configuração do armazenamento das previsões pré-calculadas
+FORECASTS_DB = "forecasts.db"
+FORECAST_COLUMNS = [
+    'yhat', 'yhat_lower', 'yhat_upper',
+    'trend', 'trend_lower', 'trend_upper',
+    'weekly', 'weekly_lower', 'weekly_upper',
+    'yearly', 'yearly_lower', 'yearly_upper',
+]
+
+_initialized = False
+
+
+# Função para abrir uma conexão com o banco de previsões (criando as tabelas na primeira vez)
+@contextmanager
+def _connect():
+    global _initialized
+    conn = sqlite3.connect(FORECASTS_DB, timeout=30)
+    if not _initialized:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS forecast_runs (
+                symbol TEXT PRIMARY KEY,
+                data_date TEXT NOT NULL,
+                horizon INTEGER NOT NULL,
+                created_at TEXT NOT NULL
+            )
+            """
+        )
+        columns = ", ".join(f"{name} REAL" for name in FORECAST_COLUMNS)
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS forecasts (
+                symbol TEXT NOT NULL,
+                ds TEXT NOT NULL,
+                {columns},
+                PRIMARY KEY (symbol, ds)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS engine_choices (
+                symbol TEXT PRIMARY KEY,
+                engine TEXT NOT NULL,
+                mape REAL,
+                fit_ms REAL,
+                evaluated_at TEXT NOT NULL
+            )
+            """
+        )
+        _initialized = True
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+# Função para gravar a previsão de um ativo, substituindo a anterior
+def save_forecast(symbol, data_date, horizon, previsao):
+    frame = previsao.reindex(columns=['ds'] + FORECAST_COLUMNS)
+    frame['ds'] = pd.to_datetime(frame['ds']).dt.strftime('%Y-%m-%d')
+    rows = [(symbol,) + tuple(None if pd.isna(v) else v for v in row) for row in frame.itertuples(index=False)]
+    placeholders = ", ".join("?" * (len(FORECAST_COLUMNS) + 2))
+
+    with _connect() as conn:
+        conn.execute("DELETE FROM forecasts WHERE symbol = ?", (symbol,))
+        conn.executemany(f"INSERT INTO forecasts VALUES ({placeholders})", rows)
+        conn.execute(
+            "INSERT OR REPLACE INTO forecast_runs VALUES (?, ?, ?, ?)",
+            (symbol, pd.Timestamp(data_date).strftime('%Y-%m-%d'), horizon, datetime.now().isoformat(timespec='seconds')),
+        )
+
+
+# Função para manter o histórico ajustado e apenas os n_days primeiros dias previstos após data_date
+def slice_forecast(previsao, data_date, n_days):
+    futuro = previsao['ds'] > data_date
+    return previsao[~futuro | (futuro.cumsum() <= n_days)].reset_index(drop=True)
+
+
+# Função para ler do banco a previsão gravada de um ativo
+def _query_forecast(symbol):
+    with _connect() as conn:
+        rows = conn.execute(
+            f"SELECT ds, {', '.join(FORECAST_COLUMNS)} FROM forecasts WHERE symbol = ? ORDER BY ds", (symbol,)
+        ).fetchall()
+    previsao = pd.DataFrame(rows, columns=['ds'] + FORECAST_COLUMNS).dropna(axis=1, how='all')
+    previsao['ds'] = pd.to_datetime(previsao['ds'])
+    return previsao
+
+
+# Função para carregar a previsão gravada de um ativo, se ela cobrir os dados até min_data_date e o horizonte pedido.
+# A previsão completa fica no cache compartilhado (frame_cache) até o próximo processamento em lote.
+def load_forecast(symbol, min_data_date=None, n_days=None):
+    with _connect() as conn:
+        run = conn.execute("SELECT data_date, horizon, created_at FROM forecast_runs WHERE symbol = ?", (symbol,)).fetchone()
+    if run is None:
+        return None
+    data_date, horizon = pd.Timestamp(run[0]), run[1]
+    if min_data_date is not None and data_date < pd.Timestamp(min_data_date):
+        return None
+    if n_days is not None and horizon < n_days:
+        return None
+
+    previsao = frame_cache.get_or_load(('forecast', symbol) + tuple(run), lambda: _query_forecast(symbol))
+    if n_days is not None:
+        previsao = slice_forecast(previsao, data_date, n_days)
+    return previsao
+
+
+# Função para gravar o motor de previsão escolhido para um ativo pelo backtest
+def save_engine_choice(symbol, engine, mape, fit_ms):
+    with _connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO engine_choices VALUES (?, ?, ?, ?, ?)",
+            (symbol, engine, mape, fit_ms, datetime.now().isoformat(timespec='seconds')),
+        )
+
+
+# Função para obter o motor de previsão escolhido para um ativo (ou None)
+def load_engine_choice(symbol):
+    with _connect() as conn:
+        row = conn.execute("SELECT engine FROM engine_choices WHERE symbol = ?", (symbol,)).fetchone()
+    return row[0] if row else None
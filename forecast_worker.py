@@ -0,0 +1,202 @@
+import multiprocessing
+import os
+import threading
+from functools import partial
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import forecast_cache
+import forecast_store
+import frame_cache
+import perf
+from config import FORECAST_HORIZON
+
+# Configuração do pool de processos que ajusta os modelos fora da thread do Streamlit
+MAX_WORKERS = 2
+# Os lotes (carteira) usam um pool separado e de menor prioridade, para que um lote com dezenas de ativos
+# não ocupe os processos que atendem as previsões pedidas na página de ações
+BATCH_WORKERS = 1
+BATCH_NICE = 10
+
+_lock = threading.Lock()
+# nome do pool ('interactive' ou 'batch') -> ProcessPoolExecutor
+_executors = {}
+# (símbolo, data do último pregão, configuração) -> Future do ajuste em andamento
+_jobs = {}
+
+
+# Função executada no processo de trabalho: ajusta o modelo e o devolve serializado
+def _fit_job(df_treino, config, init):
+    from prophet.serialize import model_to_json
+    modelo = forecast_cache.fit_with_params(df_treino, config, init)
+    return model_to_json(modelo)
+
+
+# Função executada no processo de trabalho para os lotes (carteira): ajusta o modelo e já calcula a previsão
+def _forecast_job(df_treino, config, init, horizon):
+    modelo = forecast_cache.fit_with_params(df_treino, config, init)
+    futuro = modelo.make_future_dataframe(periods=horizon, freq='B')
+    return modelo.predict(futuro)
+
+
+# Função executada no processo de trabalho para carregar o Prophet antes do primeiro ajuste
+def _warm_up():
+    import prophet
+    return prophet.__version__
+
+
+# Função executada ao iniciar cada processo do pool dos lotes: reduz a prioridade dele no sistema operacional
+def _lower_priority():
+    if hasattr(os, 'nice'):
+        os.nice(BATCH_NICE)
+
+
+# Função para obter um pool de processos, recriando-o se algum processo tiver morrido
+def _get_executor(pool='interactive', reset=False):
+    with _lock:
+        if pool not in _executors or reset:
+            # "spawn" evita herdar as threads do servidor do Streamlit no processo filho
+            context = multiprocessing.get_context('spawn')
+            if pool == 'batch':
+                _executors[pool] = ProcessPoolExecutor(max_workers=BATCH_WORKERS, mp_context=context, initializer=_lower_priority)
+            else:
+                _executors[pool] = ProcessPoolExecutor(max_workers=MAX_WORKERS, mp_context=context)
+        return _executors[pool]
+
+
+# Função para enviar uma tarefa a um pool de processos, recriando o pool se ele estiver quebrado
+def _submit_process(fn, *args, pool='interactive'):
+    try:
+        return _get_executor(pool).submit(fn, *args)
+    except BrokenProcessPool:
+        return _get_executor(pool, reset=True).submit(fn, *args)
+
+
+# Classe que representa uma previsão pedida por uma página: (ativo, horizonte) sobre um ajuste compartilhado.
+# A previsão é calculada uma vez no horizonte máximo, guardada no cache compartilhado (frame_cache)
+# e recortada para o horizonte pedido.
+class ForecastJob:
+    def __init__(self, symbol, n_days, fit_future, fit_key):
+        self.symbol = symbol
+        self.n_days = n_days
+        self._fit_future = fit_future
+        self._fit_key = fit_key
+        self._previsao = None
+
+    def done(self):
+        return self._fit_future.done()
+
+    def _predict(self, modelo):
+        with perf.span('predict', symbol=self.symbol):
+            futuro = modelo.make_future_dataframe(periods=max(self.n_days, FORECAST_HORIZON), freq='B')
+            return modelo.predict(futuro)
+
+    def result(self, timeout=None):
+        modelo = self._fit_future.result(timeout)
+        if self._previsao is None:
+            key = ('prediction',) + self._fit_key + (max(self.n_days, FORECAST_HORIZON),)
+            previsao = frame_cache.get_or_load(key, lambda: self._predict(modelo))
+            self._previsao = forecast_store.slice_forecast(previsao, self._fit_key[1], self.n_days)
+        return modelo, self._previsao
+
+
+# Função chamada quando o processo de trabalho termina um ajuste
+def _on_fit_done(key, future, process_future):
+    from prophet.serialize import model_from_json
+    symbol, last_date, config = key
+    try:
+        modelo = model_from_json(process_future.result())
+    except BaseException as e:
+        future.set_exception(e)
+    else:
+        forecast_cache.store(symbol, last_date, config, modelo)
+        future.set_result(modelo)
+    finally:
+        with _lock:
+            _jobs.pop((symbol, last_date, forecast_cache.config_key(config)), None)
+
+
+# Função para submeter o ajuste de um ativo ao pool; pedidos iguais de sessões diferentes compartilham o mesmo ajuste
+def submit_fit(symbol, df_treino, config=None):
+    config = forecast_cache.PROPHET_CONFIG if config is None else config
+    last_date = df_treino['ds'].max()
+
+    modelo = forecast_cache.lookup(symbol, last_date, config)
+    if modelo is not None:
+        future = Future()
+        future.set_result(modelo)
+        return future
+
+    job_key = (symbol, last_date, forecast_cache.config_key(config))
+    with _lock:
+        if job_key in _jobs:
+            return _jobs[job_key]
+        future = Future()
+        _jobs[job_key] = future
+
+    previous = forecast_cache.previous_model(symbol, last_date, config)
+    init = forecast_cache.warm_start_params(previous) if previous is not None else None
+    try:
+        process_future = _submit_process(_fit_job, df_treino, config, init)
+    except BaseException:
+        with _lock:
+            _jobs.pop(job_key, None)
+        raise
+    process_future.add_done_callback(lambda f: _on_fit_done((symbol, last_date, config), future, f))
+    return future
+
+
+# Função para pedir a previsão de um ativo para um horizonte, devolvendo o job sem bloquear
+def submit(symbol, df_treino, n_days, config=None):
+    config = forecast_cache.PROPHET_CONFIG if config is None else config
+    fit_key = (symbol, df_treino['ds'].max(), forecast_cache.config_key(config))
+    return ForecastJob(symbol, n_days, submit_fit(symbol, df_treino, config), fit_key)
+
+
+# Função chamada quando uma previsão do lote termina: ela é gravada em forecast_store, onde todas as páginas passam a encontrá-la
+def _on_batch_done(job_key, future, process_future):
+    _, symbol, last_date, _, horizon = job_key
+    try:
+        previsao = process_future.result()
+        forecast_store.save_forecast(symbol, last_date, horizon, previsao)
+    except BaseException as e:
+        future.set_exception(e)
+    else:
+        future.set_result(previsao)
+    finally:
+        with _lock:
+            _jobs.pop(job_key, None)
+
+
+# Função para pedir as previsões de vários ativos como um único lote: {símbolo: df_treino} -> {símbolo: Future da previsão}.
+# Cada ativo é ajustado e previsto no horizonte pedido dentro do pool dos lotes, sem ocupar a thread da página
+# nem os processos das previsões interativas.
+def submit_batch(frames, horizon, config=None):
+    config = forecast_cache.PROPHET_CONFIG if config is None else config
+    futures = {}
+    for symbol, df_treino in frames.items():
+        last_date = df_treino['ds'].max()
+        job_key = ('batch', symbol, last_date, forecast_cache.config_key(config), horizon)
+        with _lock:
+            if job_key in _jobs:
+                futures[symbol] = _jobs[job_key]
+                continue
+            future = Future()
+            _jobs[job_key] = future
+
+        previous = forecast_cache.previous_model(symbol, last_date, config)
+        init = forecast_cache.warm_start_params(previous) if previous is not None else None
+        try:
+            process_future = _submit_process(_forecast_job, df_treino, config, init, horizon, pool='batch')
+        except BaseException:
+            with _lock:
+                _jobs.pop(job_key, None)
+            raise
+        process_future.add_done_callback(partial(_on_batch_done, job_key, future))
+        futures[symbol] = future
+    return futures
+
+
+# Função para iniciar os processos de trabalho e carregar o Prophet neles antes do primeiro pedido de previsão
+def prewarm():
+    return [_submit_process(_warm_up) for _ in range(MAX_WORKERS)]
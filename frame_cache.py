@@ -0,0 +1,107 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import config
+import perf
+
+# Cache de DataFrames compartilhado por todas as sessões do processo.
+# Cada DataFrame é guardado uma única vez, em arrays NumPy contíguos (um por tipo de coluna; as colunas de tipos
+# de extensão do pandas, como str, category e Int64, são mantidas como estão), e as sessões
+# recebem cópias rasas dele, sem copiar os dados. Com o copy-on-write do pandas (padrão a partir do 3.0),
+# uma alteração feita por uma sessão (df.iloc[0, 0] = x, df['c'] = ..., inplace=True) copia antes os dados
+# tocados e não afeta o cache nem as demais sessões; to_numpy()/values devolvem arrays somente leitura.
+# As entradas saem em ordem LRU quando o limite de memória é atingido; os DataFrames já entregues continuam
+# válidos (eles mantêm os arrays vivos), só deixam de ser compartilhados com as próximas leituras.
+
+_lock = threading.Lock()
+# chave -> _Entry, em ordem de uso
+_entries = OrderedDict()
+_total_bytes = 0
+
+
+class _Entry:
+    __slots__ = ('frame', 'nbytes')
+
+    def __init__(self, df):
+        index = df.index
+        if isinstance(index.dtype, np.dtype) and not isinstance(index, pd.MultiIndex):
+            index = pd.Index(np.array(index.to_numpy(), copy=True), name=index.name, copy=False)
+        parts = []
+        for _, group in df.dtypes.groupby(df.dtypes.astype(str), sort=False):
+            columns = list(group.index)
+            dtype = group.iloc[0]
+            if isinstance(dtype, np.dtype):
+                block = np.array(df[columns].to_numpy(dtype=dtype), copy=True)
+                parts.append(pd.DataFrame(block, columns=columns, index=index, copy=False))
+            else:
+                # Tipos de extensão não cabem em um array NumPy do mesmo tipo: as colunas são guardadas sem cópia
+                parts.append(df[columns].set_axis(index))
+        if not parts:
+            self.frame = pd.DataFrame(index=index)
+        else:
+            self.frame = (parts[0] if len(parts) == 1 else pd.concat(parts, axis=1))[list(df.columns)]
+        self.nbytes = int(self.frame.memory_usage(index=True, deep=True).sum())
+
+    # Cópia rasa do DataFrame guardado: compartilha os dados e, por referenciá-lo, copia antes de qualquer alteração
+    def view(self):
+        return self.frame.copy(deep=False)
+
+
+# Função para descartar as entradas menos usadas até caber no limite de memória
+def _evict():
+    global _total_bytes
+    budget = config.FRAME_CACHE_BUDGET_MB * 2**20
+    for key in list(_entries):
+        if _total_bytes <= budget:
+            break
+        _total_bytes -= _entries.pop(key).nbytes
+
+
+# Função para guardar um DataFrame no cache e devolver uma cópia rasa da versão compartilhada dele
+def put(key, df):
+    global _total_bytes
+    entry = _Entry(df)
+    with _lock:
+        previous = _entries.pop(key, None)
+        if previous is not None:
+            _total_bytes -= previous.nbytes
+        _entries[key] = entry
+        _total_bytes += entry.nbytes
+        _evict()
+    return entry.view()
+
+
+# Função para obter um DataFrame do cache (ou None)
+def get(key):
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            _entries.move_to_end(key)
+    perf.count('frame_cache.hit' if entry is not None else 'frame_cache.miss')
+    return entry.view() if entry is not None else None
+
+
+# Função para obter um DataFrame do cache ou calculá-lo com load() e guardá-lo
+def get_or_load(key, load):
+    df = get(key)
+    if df is None:
+        df = put(key, load())
+    return df
+
+
+# Função para descartar as entradas cujas chaves satisfazem a condição (ex.: todas de um ativo)
+def discard(predicate):
+    global _total_bytes
+    with _lock:
+        for key in [key for key in _entries if predicate(key)]:
+            entry = _entries.pop(key)
+            _total_bytes -= entry.nbytes
+
+
+# Função para obter o uso atual do cache: quantidade de entradas e bytes
+def stats():
+    with _lock:
+        return {'entries': len(_entries), 'bytes': _total_bytes}
@@ -0,0 +1,113 @@
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import market_data
+import perf
+
+# Configuração do cache de indicadores fundamentalistas (stock.info)
+FUNDAMENTALS_DB = "fundamentals.db"
+
+# Grupos de campos e o tempo (em segundos) que cada grupo permanece válido
+FIELD_GROUPS = {
+    'price': (['currentPrice', 'marketCap', 'trailingPE', 'forwardPE', 'dividendYield'], 15 * 60),
+    'financials': (['totalRevenue', 'netIncomeToCommon', 'debtToEquity', 'freeCashflow', 'returnOnEquity'], 24 * 60 * 60),
+}
+
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='fundamentals')
+# Símbolos com atualização em andamento, para não disparar a mesma busca duas vezes
+_refreshing = set()
+_initialized = False
+
+
+# Função para abrir uma conexão com o banco de fundamentos (criando a tabela na primeira vez)
+@contextmanager
+def _connect():
+    global _initialized
+    conn = sqlite3.connect(FUNDAMENTALS_DB, timeout=30)
+    if not _initialized:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS fundamentals (
+                symbol TEXT NOT NULL,
+                field_group TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (symbol, field_group)
+            )
+            """
+        )
+        _initialized = True
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+# Função para ler os grupos de campos gravados de um ativo: {grupo: (valores, fetched_at)}
+def _load(symbol):
+    with _connect() as conn:
+        rows = conn.execute(
+            "SELECT field_group, payload, fetched_at FROM fundamentals WHERE symbol = ?", (symbol,)
+        ).fetchall()
+    return {group: (json.loads(payload), fetched_at) for group, payload, fetched_at in rows}
+
+
+# Função para buscar o stock.info de um ativo e gravar todos os grupos de campos
+def fetch(symbol):
+    provider = market_data.get_provider()
+    with perf.span(f'{provider.name}.info', symbol=symbol):
+        info = provider.info(symbol)
+    now = time.time()
+    rows = [
+        (symbol, group, json.dumps({field: info[field] for field in fields if info.get(field) is not None}), now)
+        for group, (fields, _) in FIELD_GROUPS.items()
+    ]
+    with _connect() as conn:
+        conn.executemany("INSERT OR REPLACE INTO fundamentals VALUES (?, ?, ?, ?)", rows)
+    return info
+
+
+# Função executada em segundo plano para atualizar os fundamentos vencidos
+def _refresh(symbol):
+    try:
+        fetch(symbol)
+    finally:
+        with _lock:
+            _refreshing.discard(symbol)
+
+
+# Função para agendar a atualização de um ativo, se ainda não houver uma em andamento
+def _schedule_refresh(symbol):
+    with _lock:
+        if symbol in _refreshing:
+            return
+        _refreshing.add(symbol)
+    _executor.submit(_refresh, symbol)
+
+
+# Função para obter os fundamentos de um ativo: devolve o que estiver gravado na hora,
+# mesmo vencido, e atualiza os grupos vencidos em segundo plano.
+# Só bloqueia na primeira consulta do ativo, quando ainda não há nada gravado.
+def get_info(symbol):
+    stored = _load(symbol)
+    if not all(group in stored for group in FIELD_GROUPS):
+        perf.count('fundamentals_cache.miss')
+        return fetch(symbol)
+
+    now = time.time()
+    info = {}
+    stale = False
+    for group, (_, ttl) in FIELD_GROUPS.items():
+        values, fetched_at = stored[group]
+        info.update(values)
+        stale = stale or now - fetched_at > ttl
+    perf.count('fundamentals_cache.stale' if stale else 'fundamentals_cache.hit')
+    if stale:
+        _schedule_refresh(symbol)
+    return info
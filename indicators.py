@@ -0,0 +1,117 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import perf
+
+# Indicadores técnicos calculados de forma vetorizada sobre todo o histórico de uma vez
+MAX_ENTRIES = 64
+TRADING_DAYS = 252
+
+# Indicadores que o usuário pode escolher: sobrepostos ao gráfico de preço ou em painéis abaixo dele
+OVERLAYS = {
+    'MM 20': ['sma_20'],
+    'MM 50': ['sma_50'],
+    'MM 200': ['sma_200'],
+    'MME 12/26': ['ema_12', 'ema_26'],
+    'Bandas de Bollinger': ['bb_upper', 'bb_mid', 'bb_lower'],
+}
+PANELS = {
+    'RSI': ['rsi'],
+    'MACD': ['macd', 'macd_signal', 'macd_hist'],
+    'Volatilidade': ['volatility'],
+    'Drawdown': ['drawdown'],
+}
+
+_lock = threading.Lock()
+# (símbolo, data e fechamento do último pregão, quantidade de pregões) -> DataFrame com todos os indicadores
+_cache = OrderedDict()
+
+
+# Função para calcular a média móvel simples
+def sma(close, window):
+    return close.rolling(window, min_periods=window).mean()
+
+
+# Função para calcular a média móvel exponencial
+def ema(close, span):
+    return close.ewm(span=span, adjust=False, min_periods=span).mean()
+
+
+# Função para calcular as bandas de Bollinger (média, banda superior e banda inferior)
+def bollinger(close, window=20, num_std=2):
+    mid = sma(close, window)
+    std = close.rolling(window, min_periods=window).std(ddof=0)
+    return mid, mid + num_std * std, mid - num_std * std
+
+
+# Função para calcular o RSI com a suavização de Wilder
+def rsi(close, period=14):
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+    rs = gain / loss.replace(0, np.nan)
+    return (100 - 100 / (1 + rs)).where(loss != 0, 100.0).where(gain.notna())
+
+
+# Função para calcular o MACD (linha, sinal e histograma)
+def macd(close, fast=12, slow=26, signal=9):
+    line = ema(close, fast) - ema(close, slow)
+    signal_line = line.ewm(span=signal, adjust=False, min_periods=signal).mean()
+    return line, signal_line, line - signal_line
+
+
+# Função para calcular a volatilidade anualizada dos retornos logarítmicos em uma janela móvel
+def volatility(close, window=21):
+    log_returns = np.log(close).diff()
+    return log_returns.rolling(window, min_periods=window).std() * np.sqrt(TRADING_DAYS)
+
+
+# Função para calcular a queda percentual em relação ao maior preço anterior
+def drawdown(close):
+    return close / close.cummax() - 1
+
+
+# Função para calcular todos os indicadores de um histórico em um único DataFrame
+def compute_all(hist):
+    close = hist['Close']
+    bb_mid, bb_upper, bb_lower = bollinger(close)
+    macd_line, macd_signal, macd_hist = macd(close)
+    return pd.DataFrame({
+        'sma_20': sma(close, 20),
+        'sma_50': sma(close, 50),
+        'sma_200': sma(close, 200),
+        'ema_12': ema(close, 12),
+        'ema_26': ema(close, 26),
+        'bb_mid': bb_mid,
+        'bb_upper': bb_upper,
+        'bb_lower': bb_lower,
+        'rsi': rsi(close),
+        'macd': macd_line,
+        'macd_signal': macd_signal,
+        'macd_hist': macd_hist,
+        'volatility': volatility(close),
+        'drawdown': drawdown(close),
+    }, index=hist.index)
+
+
+# Função para obter os indicadores de um ativo, reaproveitando o cálculo enquanto não chegar um novo pregão
+def get_indicators(symbol, hist):
+    key = (symbol, hist.index[-1], len(hist), hist['Close'].iloc[-1])
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            perf.count('indicators.hit')
+            return _cache[key]
+
+    perf.count('indicators.miss')
+    with perf.span('indicators', rows=len(hist)):
+        result = compute_all(hist)
+
+    with _lock:
+        _cache[key] = result
+        while len(_cache) > MAX_ENTRIES:
+            _cache.popitem(last=False)
+    return result
@@ -0,0 +1,65 @@
+import threading
+import time
+
+import config
+import market_data
+import price_store
+
+# Modo ao vivo: uma única thread busca a última cotação dos ativos abertos em alguma sessão e a registra
+# em price_store.push_tick. As páginas só leem a barra e as cotações do dia, sem recarregar o histórico.
+
+_lock = threading.Lock()
+# símbolo -> último pedido de uma sessão (time.monotonic)
+_subscriptions = {}
+_thread = None
+
+
+# Função para buscar a cotação de um ativo e registrá-la na barra do dia
+def poll(symbol):
+    tick = market_data.get_provider().quote(symbol)
+    if tick is not None:
+        price_store.push_tick(symbol, tick)
+
+
+# Função para obter os ativos ainda pedidos por alguma sessão, esquecendo os que ficaram sem acesso
+def _active_symbols():
+    limite = time.monotonic() - config.LIVE_IDLE_TIMEOUT
+    with _lock:
+        for symbol in [symbol for symbol, visto in _subscriptions.items() if visto < limite]:
+            del _subscriptions[symbol]
+        return list(_subscriptions)
+
+
+# Função executada na thread de cotações, enquanto houver ativos pedidos
+def _run():
+    global _thread
+    while True:
+        inicio = time.monotonic()
+        symbols = _active_symbols()
+        if not symbols:
+            with _lock:
+                if not _subscriptions:
+                    _thread = None
+                    return
+            continue
+        for symbol in symbols:
+            try:
+                poll(symbol)
+            except Exception:
+                # A falha de uma cotação não interrompe as demais; ela é repetida no próximo ciclo
+                pass
+        time.sleep(max(0, config.LIVE_POLL_INTERVAL - (time.monotonic() - inicio)))
+
+
+# Função para pedir as cotações ao vivo de um ativo; deve ser chamada a cada atualização da página
+def subscribe(symbol):
+    global _thread
+    with _lock:
+        novo = symbol not in _subscriptions
+        _subscriptions[symbol] = time.monotonic()
+        if _thread is None:
+            _thread = threading.Thread(target=_run, name='live-quotes', daemon=True)
+            _thread.start()
+    if novo and price_store.live_bar(symbol) is None:
+        # A primeira cotação é buscada na hora, para a página não abrir vazia
+        poll(symbol)
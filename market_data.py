@@ -0,0 +1,239 @@
+import json
+import os
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import config
+
+# Fontes de dados de mercado. O restante do site só acessa cotações e fundamentos por meio delas,
+# o que permite trocar o Yahoo por arquivos gravados ou por dados sintéticos (testes de carga e benchmarks).
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+# Eventos do ativo informados junto com o histórico (pelo Yahoo). Os preços vêm ajustados por eles, então um
+# evento novo muda o ajuste de todo o histórico anterior (ver price_store.refresh).
+ACTION_COLUMNS = ['Dividends', 'Stock Splits']
+
+
+# Função para padronizar um histórico: colunas OHLCV (e os eventos, quando a fonte os informa) e índice de datas sem fuso horário
+def _normalize(df):
+    if df is None or df.empty:
+        return pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([], name='Date'))
+    df = df[COLUMNS + [c for c in ACTION_COLUMNS if c in df.columns]].dropna(how='all', subset=COLUMNS)
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    df.index = index.normalize().rename('Date')
+    return df
+
+
+# Interface comum das fontes de dados de mercado
+class MarketDataProvider(ABC):
+    name = 'base'
+
+    # Histórico diário (OHLCV) de um ativo a partir de start
+    @abstractmethod
+    def history(self, symbol, start):
+        pass
+
+    # Histórico de vários ativos: {símbolo: DataFrame}. As fontes que suportam busca em lote sobrescrevem este método.
+    def history_many(self, symbols, start):
+        return {symbol: self.history(symbol, start) for symbol in symbols}
+
+    # Indicadores fundamentalistas do ativo (mesmas chaves do stock.info do yfinance)
+    @abstractmethod
+    def info(self, symbol):
+        pass
+
+    # Última cotação do ativo: {'time', 'price', 'volume'}, com o volume acumulado no dia.
+    # Por padrão repete o último pregão do histórico; as fontes com cotação em tempo real sobrescrevem este método.
+    def quote(self, symbol):
+        df = self.history(symbol, pd.Timestamp.today().normalize() - pd.Timedelta(days=7))
+        if df.empty:
+            return None
+        return {'time': pd.Timestamp.now(), 'price': float(df['Close'].iloc[-1]), 'volume': int(df['Volume'].iloc[-1])}
+
+
+# Fonte de dados real: Yahoo Finance via yfinance
+class YFinanceProvider(MarketDataProvider):
+    name = 'yf'
+
+    def history(self, symbol, start):
+        import yfinance as yf
+        return _normalize(yf.Ticker(symbol).history(start=start))
+
+    def history_many(self, symbols, start):
+        import yfinance as yf
+        data = yf.download(list(symbols), start=start, group_by='ticker', auto_adjust=True, actions=True, progress=False, threads=True)
+        available = set(data.columns.get_level_values(0)) if not data.empty else set()
+        return {symbol: _normalize(data[symbol]) for symbol in symbols if symbol in available}
+
+    def info(self, symbol):
+        import yfinance as yf
+        return yf.Ticker(symbol).info
+
+    def quote(self, symbol):
+        import yfinance as yf
+        fast = yf.Ticker(symbol).fast_info
+        return {'time': pd.Timestamp.now(), 'price': float(fast['lastPrice']), 'volume': int(fast['lastVolume'] or 0)}
+
+
+# Fonte de dados gravada em disco: <fixtures_dir>/history/<símbolo>.csv e <fixtures_dir>/info/<símbolo>.json,
+# com um atraso configurável por chamada para simular a rede
+class ReplayProvider(MarketDataProvider):
+    name = 'replay'
+
+    def __init__(self, fixtures_dir=None, latency=None):
+        self.fixtures_dir = fixtures_dir or config.FIXTURES_DIR
+        self.latency = config.REPLAY_LATENCY if latency is None else latency
+
+    def _path(self, kind, symbol, ext):
+        return os.path.join(self.fixtures_dir, kind, f"{symbol}.{ext}")
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _read_history(self, symbol, start):
+        path = self._path('history', symbol, 'csv')
+        if not os.path.exists(path):
+            return _normalize(None)
+        df = pd.read_csv(path, index_col='Date', parse_dates=['Date'])
+        return _normalize(df[df.index >= pd.Timestamp(start)])
+
+    def history(self, symbol, start):
+        self._wait()
+        return self._read_history(symbol, start)
+
+    def history_many(self, symbols, start):
+        # Uma única espera para o lote, como em uma única requisição
+        self._wait()
+        return {symbol: self._read_history(symbol, start) for symbol in symbols}
+
+    def info(self, symbol):
+        self._wait()
+        path = self._path('info', symbol, 'json')
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+
+
+# Função para gravar em disco o histórico e os fundamentos de vários ativos, no formato lido por ReplayProvider
+def record_fixtures(provider, symbols, fixtures_dir, start=config.DATA_INICIO):
+    os.makedirs(os.path.join(fixtures_dir, 'history'), exist_ok=True)
+    os.makedirs(os.path.join(fixtures_dir, 'info'), exist_ok=True)
+    for symbol, df in provider.history_many(symbols, start).items():
+        df.to_csv(os.path.join(fixtures_dir, 'history', f"{symbol}.csv"), index_label='Date')
+    for symbol in symbols:
+        with open(os.path.join(fixtures_dir, 'info', f"{symbol}.json"), 'w', encoding='utf-8') as f:
+            json.dump(provider.info(symbol), f, default=str)
+
+
+# Fonte de dados sintética: passeio aleatório geométrico por ativo, determinístico para cada símbolo,
+# para qualquer quantidade de ativos
+class SyntheticProvider(MarketDataProvider):
+    name = 'synthetic'
+
+    def __init__(self, seed=0, start_price=50.0, drift=0.05, volatility=0.3):
+        self.seed = seed
+        self.start_price = start_price
+        self.drift = drift
+        self.volatility = volatility
+        self._lock = threading.Lock()
+        self._series = {}
+        # símbolo -> (gerador, último preço, volume do dia) das cotações simuladas
+        self._ticks = {}
+        self._index = pd.bdate_range(config.DATA_INICIO, date.today(), name='Date')
+
+    def _rng(self, symbol):
+        return np.random.default_rng([self.seed, zlib.crc32(symbol.encode('utf-8'))])
+
+    # Série completa do ativo (gerada uma vez), para que buscas incrementais sejam consistentes com as anteriores
+    def _full_history(self, symbol):
+        with self._lock:
+            if symbol in self._series:
+                return self._series[symbol]
+
+        index = self._index
+        rng = self._rng(symbol)
+        dt = 1 / 252
+        returns = (self.drift - self.volatility ** 2 / 2) * dt + self.volatility * np.sqrt(dt) * rng.standard_normal(len(index))
+        close = self.start_price * rng.uniform(0.2, 5) * np.exp(np.cumsum(returns))
+        open_ = np.concatenate(([close[0]], close[:-1]))
+        spread = np.abs(rng.normal(0, self.volatility * np.sqrt(dt), len(index))) * close
+        df = pd.DataFrame({
+            'Open': open_,
+            'High': np.maximum(open_, close) + spread,
+            'Low': np.minimum(open_, close) - spread,
+            'Close': close,
+            'Volume': rng.integers(10_000, 5_000_000, len(index)),
+        }, index=index)
+
+        with self._lock:
+            self._series[symbol] = df
+        return df
+
+    def history(self, symbol, start):
+        df = self._full_history(symbol)
+        return df[df.index >= pd.Timestamp(start)]
+
+    # Cotação simulada (substitui um feed em tempo real nos testes): passeio aleatório a partir do último
+    # fechamento, em passos de cinco minutos de pregão, com volume acumulado
+    def quote(self, symbol):
+        with self._lock:
+            state = self._ticks.get(symbol)
+        if state is None:
+            last = self._full_history(symbol).iloc[-1]
+            state = (np.random.default_rng([self.seed, zlib.crc32(symbol.encode('utf-8')), 1]), float(last['Close']), 0)
+        rng, price, volume = state
+        price *= float(np.exp(self.volatility * np.sqrt(1 / (252 * 78)) * rng.standard_normal()))
+        volume += int(rng.integers(100, 50_000))
+        with self._lock:
+            self._ticks[symbol] = (rng, price, volume)
+        return {'time': pd.Timestamp.now(), 'price': price, 'volume': volume}
+
+    def info(self, symbol):
+        rng = self._rng(symbol)
+        close = self._full_history(symbol)['Close'].iloc[-1]
+        shares = int(rng.integers(10**8, 10**10))
+        return {
+            'currentPrice': round(float(close), 2),
+            'marketCap': int(close * shares),
+            'trailingPE': round(float(rng.uniform(3, 40)), 2),
+            'forwardPE': round(float(rng.uniform(3, 40)), 2),
+            'dividendYield': round(float(rng.uniform(0, 0.1)), 4),
+            'totalRevenue': int(rng.integers(10**8, 10**11)),
+            'netIncomeToCommon': int(rng.integers(10**7, 10**10)),
+            'debtToEquity': round(float(rng.uniform(0, 200)), 2),
+            'freeCashflow': int(rng.integers(10**7, 10**10)),
+            'returnOnEquity': round(float(rng.uniform(-0.1, 0.4)), 4),
+        }
+
+
+PROVIDERS = {
+    'yfinance': YFinanceProvider,
+    'replay': ReplayProvider,
+    'synthetic': SyntheticProvider,
+}
+
+_provider = None
+
+
+# Função para obter a fonte de dados configurada em config.MARKET_DATA_PROVIDER
+def get_provider():
+    global _provider
+    if _provider is None:
+        _provider = PROVIDERS[config.MARKET_DATA_PROVIDER]()
+    return _provider
+
+
+# Função para trocar a fonte de dados (usada pelos benchmarks)
+def set_provider(provider):
+    global _provider
+    _provider = provider
@@ -0,0 +1,88 @@
+import json
+import os
+from abc import ABC, abstractmethod
+
+import pandas as pd
+
+import config
+
+# Fontes de notícias. Cada fonte devolve os artigos de um ativo no formato
+# {'source', 'symbol', 'title', 'summary', 'url', 'published'}, com published sem fuso horário (UTC);
+# a pontuação e a gravação ficam em news_store.
+
+
+# Função para converter a data de publicação (texto ISO ou segundos desde 1970) para UTC sem fuso horário
+def _timestamp(value):
+    ts = pd.Timestamp(value, unit='s') if isinstance(value, (int, float)) else pd.Timestamp(value)
+    return ts.tz_convert(None) if ts.tz is not None else ts
+
+
+# Interface comum das fontes de notícias
+class NewsSource(ABC):
+    name = 'base'
+
+    # Artigos recentes sobre um ativo
+    @abstractmethod
+    def fetch(self, symbol):
+        pass
+
+
+# Fonte real: notícias do Yahoo Finance via yfinance
+class YFinanceNewsSource(NewsSource):
+    name = 'yf'
+
+    def fetch(self, symbol):
+        import yfinance as yf
+        artigos = []
+        for item in yf.Ticker(symbol).news or []:
+            # As versões mais novas do yfinance trazem os campos dentro de 'content'
+            content = item.get('content', item)
+            published = content.get('pubDate') or content.get('providerPublishTime')
+            if not content.get('title') or published is None:
+                continue
+            artigos.append({
+                'source': (content.get('provider') or {}).get('displayName') or content.get('publisher', ''),
+                'symbol': symbol,
+                'title': content['title'],
+                'summary': content.get('summary') or '',
+                'url': (content.get('canonicalUrl') or {}).get('url') or content.get('link'),
+                'published': _timestamp(published),
+            })
+        return artigos
+
+
+# Fonte local: lista de artigos em um arquivo JSON (config.NEWS_FILE), para uso sem rede e em testes
+class FileNewsSource(NewsSource):
+    name = 'file'
+
+    def __init__(self, path=None):
+        self.path = path or config.NEWS_FILE
+
+    def fetch(self, symbol):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding='utf-8') as f:
+            items = json.load(f)
+        return [dict(item, published=_timestamp(item['published'])) for item in items if item.get('symbol') == symbol]
+
+
+SOURCES = {
+    'yfinance': YFinanceNewsSource,
+    'file': FileNewsSource,
+}
+
+_source = None
+
+
+# Função para obter a fonte de notícias configurada em config.NEWS_SOURCE
+def get_source():
+    global _source
+    if _source is None:
+        _source = SOURCES[config.NEWS_SOURCE]()
+    return _source
+
+
+# Função para trocar a fonte de notícias (usada nos testes)
+def set_source(source):
+    global _source
+    _source = source
@@ -0,0 +1,179 @@
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+import news_sources
+import perf
+
+# Configuração do armazenamento de notícias
+NEWS_DB = "news.db"
+# Intervalo mínimo (em segundos) entre duas buscas de notícias do mesmo ativo
+REFRESH_INTERVAL = 15 * 60
+PAGE_SIZE = 10
+# Esquemas aceitos nos links das notícias (os demais, como javascript:, são descartados)
+URL_SCHEMES = ('http', 'https')
+
+# Nomes pelos quais cada ativo aparece nas notícias, além do próprio código
+ALIASES = {
+    'BBAS3.SA': ['Banco do Brasil'],
+    'PETR4.SA': ['Petrobras'],
+    'VALE3.SA': ['Vale'],
+    'AAPL': ['Apple'],
+    'TSLA': ['Tesla'],
+}
+# Termos que indicam notícias com impacto no preço
+TERMOS_RELEVANTES = [
+    'resultado', 'lucro', 'prejuízo', 'receita', 'dividendo', 'produção', 'reajuste', 'aquisição', 'fusão',
+    'valor de mercado', 'rebaixa', 'eleva', 'earnings', 'revenue', 'profit', 'dividend', 'downgrade', 'upgrade',
+    'acquisition', 'guidance',
+]
+
+_lock = threading.Lock()
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='news')
+_last_refresh = {}
+_initialized = False
+
+
+# Função para abrir uma conexão com o banco de notícias (criando a tabela e os índices na primeira vez)
+@contextmanager
+def _connect():
+    global _initialized
+    conn = sqlite3.connect(NEWS_DB, timeout=30)
+    if not _initialized:
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                id INTEGER PRIMARY KEY,
+                symbol TEXT NOT NULL,
+                published TEXT NOT NULL,
+                source TEXT,
+                title TEXT NOT NULL,
+                summary TEXT,
+                url TEXT,
+                stars INTEGER NOT NULL,
+                UNIQUE (symbol, source, title)
+            );
+            CREATE INDEX IF NOT EXISTS ix_articles_symbol_published ON articles (symbol, published);
+            """
+        )
+        _initialized = True
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+# Função para pontuar a relevância de um artigo para o ativo (de 1 a 5 estrelas):
+# o ativo citado no título vale mais que no resumo, e cada termo de impacto no preço soma uma estrela (até duas)
+def score(article):
+    symbol = article['symbol']
+    nomes = [nome.lower() for nome in [symbol.split('.')[0]] + ALIASES.get(symbol, [])]
+    titulo = article['title'].lower()
+    texto = titulo + ' ' + (article.get('summary') or '').lower()
+    stars = 1
+    if any(nome in titulo for nome in nomes):
+        stars += 2
+    elif any(nome in texto for nome in nomes):
+        stars += 1
+    stars += min(2, sum(termo in texto for termo in TERMOS_RELEVANTES))
+    return min(stars, 5)
+
+
+# Função para validar o link de uma notícia: devolve o link se ele for http(s) com domínio, ou None
+def safe_url(url):
+    if not url:
+        return None
+    try:
+        partes = urlsplit(url)
+    except ValueError:
+        return None
+    return url if partes.scheme in URL_SCHEMES and partes.netloc else None
+
+
+# Função para buscar as notícias de vários ativos na fonte configurada e gravar as novas, já pontuadas
+def ingest(symbols):
+    source = news_sources.get_source()
+    rows = []
+    with perf.span(f'{source.name}.news', symbols=len(symbols)):
+        for symbol in symbols:
+            for article in source.fetch(symbol):
+                rows.append((
+                    symbol, pd.Timestamp(article['published']).strftime('%Y-%m-%dT%H:%M:%S'), article.get('source'),
+                    article['title'], article.get('summary'), safe_url(article.get('url')), score(article),
+                ))
+    with _connect() as conn:
+        antes = conn.total_changes
+        conn.executemany(
+            "INSERT OR IGNORE INTO articles (symbol, published, source, title, summary, url, stars) VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+        )
+        novos = conn.total_changes - antes
+    perf.count('news.ingested', novos)
+    return novos
+
+
+# Função para liberar uma nova busca de notícias dos ativos na próxima atualização (após uma falha)
+def _forget_refresh(symbols):
+    with _lock:
+        for symbol in symbols:
+            _last_refresh.pop(symbol, None)
+
+
+# Função executada em segundo plano para buscar notícias (as falhas são ignoradas e repetidas na próxima atualização)
+def _ingest_quietly(symbols):
+    try:
+        ingest(symbols)
+    except Exception:
+        _forget_refresh(symbols)
+
+
+# Função para manter as notícias dos ativos em dia (respeitando REFRESH_INTERVAL): ativos sem nenhuma notícia
+# gravada são buscados na hora; os demais são atualizados em segundo plano, sem atrasar a página
+def refresh(symbols):
+    now = time.monotonic()
+    with _lock:
+        due = [symbol for symbol in dict.fromkeys(symbols) if now - _last_refresh.get(symbol, -REFRESH_INTERVAL) >= REFRESH_INTERVAL]
+        for symbol in due:
+            _last_refresh[symbol] = now
+    if not due:
+        return
+
+    with _connect() as conn:
+        gravados = {symbol for (symbol,) in conn.execute(
+            f"SELECT DISTINCT symbol FROM articles WHERE symbol IN ({', '.join('?' * len(due))})", due
+        )}
+    vazios = [symbol for symbol in due if symbol not in gravados]
+    if vazios:
+        try:
+            ingest(vazios)
+        except Exception:
+            # Como em segundo plano, a falha não pode esconder as notícias até passar REFRESH_INTERVAL
+            _forget_refresh(due)
+            raise
+    if len(vazios) < len(due):
+        _executor.submit(_ingest_quietly, [symbol for symbol in due if symbol in gravados])
+
+
+# Função para consultar uma página de notícias dos ativos, das mais recentes para as mais antigas.
+# Devolve os artigos da página e o total de artigos dos ativos.
+def query(symbols, page=0, page_size=PAGE_SIZE):
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return [], 0
+    filtro = f"symbol IN ({', '.join('?' * len(symbols))})"
+    with perf.span('news.query', symbols=len(symbols), page=page), _connect() as conn:
+        total = conn.execute(f"SELECT COUNT(*) FROM articles WHERE {filtro}", symbols).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT symbol, published, source, title, summary, url, stars FROM articles WHERE {filtro}"
+            " ORDER BY published DESC, id DESC LIMIT ? OFFSET ?", symbols + [page_size, page * page_size]
+        ).fetchall()
+    campos = ['symbol', 'published', 'source', 'title', 'summary', 'url', 'stars']
+    artigos = [dict(zip(campos, row)) for row in rows]
+    for artigo in artigos:
+        artigo['published'] = pd.Timestamp(artigo['published'])
+    return artigos, total
@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+import pandas as pd
+
+import config
+
+# Medição de desempenho: intervalos (spans) de tempo e contadores agrupados por renderização de página.
+# Cada renderização vira uma linha em config.METRICS_FILE; spans fora de uma página (ex.: nos processos
+# de trabalho) são gravados sozinhos.
+
+_local = threading.local()
+_file_lock = threading.Lock()
+
+
+# Função para gravar um registro no arquivo de métricas, rotacionando-o quando passa de config.METRICS_MAX_BYTES
+def _write(record):
+    line = json.dumps(record, default=str) + "\n"
+    with _file_lock:
+        with open(config.METRICS_FILE, 'a', encoding='utf-8') as f:
+            f.write(line)
+            cheio = f.tell() >= config.METRICS_MAX_BYTES
+        if cheio:
+            try:
+                os.replace(config.METRICS_FILE, config.METRICS_FILE + '.1')
+            except FileNotFoundError:
+                # Outro processo acabou de rotacionar o arquivo
+                pass
+
+
+# Função para obter a renderização de página em andamento nesta thread (ou None)
+def _current():
+    return getattr(_local, 'render', None)
+
+
+# Função para medir o tempo de um trecho de código
+@contextmanager
+def span(name, **attrs):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        record = {'name': name, 'ms': round((time.perf_counter() - inicio) * 1000, 3), **attrs}
+        render = _current()
+        if render is not None:
+            render['spans'].append(record)
+        else:
+            _write({'type': 'span', 'ts': time.time(), 'pid': os.getpid(), **record})
+
+
+# Função para incrementar um contador (acertos/erros de cache, bytes baixados...) da página em andamento
+def count(name, value=1):
+    render = _current()
+    if render is not None:
+        render['counters'][name] += value
+
+
+# Função para medir uma renderização completa de página, com todos os spans e contadores dela.
+# Pode ser aninhada (ex.: o fragmento do modo ao vivo dentro da página): ao terminar, a renderização
+# anterior volta a ser a atual e continua recebendo os spans e contadores seguintes.
+@contextmanager
+def page_render(page):
+    anterior = _current()
+    render = {'spans': [], 'counters': Counter()}
+    _local.render = render
+    inicio = time.perf_counter()
+    try:
+        yield render
+    finally:
+        _local.render = anterior
+        _write({
+            'type': 'page',
+            'ts': time.time(),
+            'page': page,
+            'ms': round((time.perf_counter() - inicio) * 1000, 3),
+            'spans': render['spans'],
+            'counters': dict(render['counters']),
+        })
+
+
+# Função para ler as últimas `limit` linhas de um arquivo, lendo-o de trás para frente em blocos
+def _tail_lines(path, limit, block=1 << 16):
+    if not os.path.exists(path):
+        return []
+    with open(path, 'rb') as f:
+        fim = f.seek(0, os.SEEK_END)
+        pos, dados = fim, b''
+        while pos > 0 and dados.count(b'\n') <= limit:
+            pos = max(0, pos - block)
+            f.seek(pos)
+            dados = f.read(fim - pos)
+    linhas = dados.decode('utf-8', errors='replace').splitlines()
+    # A primeira linha pode ter sido cortada no meio quando a leitura não começou no início do arquivo
+    if pos > 0:
+        linhas = linhas[1:]
+    return linhas[-limit:]
+
+
+# Função para ler os registros de página mais recentes do arquivo de métricas (e do anterior à rotação, se faltar)
+def load_page_records(limit=5000):
+    lines = _tail_lines(config.METRICS_FILE, limit)
+    if len(lines) < limit:
+        lines = _tail_lines(config.METRICS_FILE + '.1', limit - len(lines)) + lines
+    records = (json.loads(line) for line in lines if line.strip())
+    return [record for record in records if record.get('type') == 'page']
+
+
+# Função para calcular as latências p50/p95 por página e por span
+def latency_summary(records):
+    if not records:
+        return pd.DataFrame(), pd.DataFrame()
+    pages = pd.DataFrame([{'page': r['page'], 'ms': r['ms']} for r in records])
+    spans = pd.DataFrame([{'page': r['page'], 'span': s['name'], 'ms': s['ms']} for r in records for s in r['spans']])
+
+    def summarize(df, keys):
+        if df.empty:
+            return df
+        grouped = df.groupby(keys)['ms']
+        return pd.DataFrame({
+            'renderizações': grouped.size(),
+            'p50 (ms)': grouped.quantile(0.5),
+            'p95 (ms)': grouped.quantile(0.95),
+        }).round(1)
+
+    return summarize(pages, ['page']), summarize(spans, ['page', 'span'])
+
+
+# Função para somar os contadores (acertos/erros de cache, bytes) por página
+def counter_summary(records):
+    rows = [{'page': r['page'], **r['counters']} for r in records]
+    if not rows:
+        return pd.DataFrame()
+    return pd.DataFrame(rows).groupby('page').sum(min_count=1).fillna(0).astype(int)
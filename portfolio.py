@@ -0,0 +1,126 @@
+from datetime import date
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+import config
+import forecast_engines
+import forecast_store
+import forecast_worker
+
+# Análise da carteira de favoritas: todos os ativos alinhados em um único calendário e estatísticas
+# calculadas de forma vetorizada (uma matriz de retornos), com as previsões de todos os ativos pedidas em lote.
+
+TRADING_DAYS = 252
+
+
+# Função para alinhar os fechamentos em um único calendário (união dos pregões da B3 e da NYSE) e calcular os retornos diários.
+# Nos feriados de uma das bolsas o último fechamento é repetido, o que dá retorno zero naquele dia.
+def align_returns(closes):
+    closes = closes.sort_index().ffill()
+    return closes.pct_change(fill_method=None).iloc[1:]
+
+
+# Função para montar o resumo de risco de uma carteira sem retornos: tabelas vazias e medidas NaN
+def _empty_summary(symbols):
+    vazio = pd.DataFrame(index=symbols, columns=symbols, dtype=float)
+    return {
+        'cov': vazio,
+        'corr': vazio,
+        'ativos': pd.DataFrame(columns=['peso (%)', 'retorno anual (%)', 'volatilidade (%)', 'contribuição ao risco (%)'], dtype=float),
+        'volatilidade': np.nan,
+        'var_parametrico': np.nan,
+        'var_historico': np.nan,
+    }
+
+
+# Função para calcular o risco da carteira: covariância e correlação dos retornos, volatilidade e VaR de um dia.
+# Sem pesos informados, a carteira tem o mesmo peso em cada ativo.
+def risk_summary(returns, weights=None, confidence=0.95):
+    returns = returns.dropna(axis=1, how='all')
+    symbols = list(returns.columns)
+    # Sem retornos suficientes para a covariância (ex.: janela sem pregões em comum), o resumo sai vazio em vez de falhar
+    if len(returns) < 2 or not symbols:
+        return _empty_summary(symbols)
+    if weights is None:
+        w = np.full(len(symbols), 1 / len(symbols))
+    else:
+        w = np.array([weights[symbol] for symbol in symbols], dtype=float)
+        w = w / w.sum()
+
+    cov = returns.cov() * TRADING_DAYS
+    sigma_assets = cov.to_numpy() @ w
+    sigma = float(np.sqrt(w @ sigma_assets))
+    # Retornos diários da carteira; antes do início da série de um ativo o retorno dele conta como zero
+    diario = returns.fillna(0).to_numpy() @ w
+    z = NormalDist().inv_cdf(confidence)
+
+    ativos = pd.DataFrame({
+        'peso (%)': w * 100,
+        'retorno anual (%)': returns.mean().to_numpy() * TRADING_DAYS * 100,
+        'volatilidade (%)': np.sqrt(np.diag(cov)) * 100,
+        'contribuição ao risco (%)': w * sigma_assets / sigma ** 2 * 100,
+    }, index=symbols)
+    return {
+        'cov': cov,
+        'corr': returns.corr(),
+        'ativos': ativos,
+        'volatilidade': sigma,
+        'var_parametrico': z * sigma / np.sqrt(TRADING_DAYS) - diario.mean(),
+        'var_historico': -np.quantile(diario, 1 - confidence),
+    }
+
+
+# Função para pedir as previsões de todos os ativos de uma vez, sem esperar. Com o Prophet, usa as gravadas em
+# forecast_store quando estiverem em dia e envia as demais como um lote ao pool de processos (forecast_worker.submit_batch),
+# no horizonte máximo; os motores rápidos (o padrão, config.PORTFOLIO_FORECAST_ENGINE) são calculados na hora.
+# Devolve {símbolo: previsão} das prontas e {símbolo: Future} das pendentes.
+def batch_forecast(closes, n_days, engine=None):
+    engine = engine or config.PORTFOLIO_FORECAST_ENGINE
+    minimo = forecast_engines.get_engine(engine).min_rows
+    hoje = pd.Timestamp(date.today())
+    prontas, treino = {}, {}
+    for symbol in closes.columns:
+        serie = closes[symbol].dropna()
+        serie = serie[serie.index < hoje]
+        # Ativos com histórico curto demais para o motor ficam de fora da tabela
+        if len(serie) < minimo:
+            continue
+        df_treino = pd.DataFrame({'ds': serie.index, 'y': serie.to_numpy()})
+        if engine != 'prophet':
+            prontas[symbol] = forecast_engines.predict(engine, symbol, df_treino, n_days)
+            continue
+        previsao = forecast_store.load_forecast(symbol, min_data_date=df_treino['ds'].max(), n_days=n_days)
+        if previsao is not None:
+            prontas[symbol] = previsao
+        else:
+            treino[symbol] = df_treino
+    return prontas, forecast_worker.submit_batch(treino, config.FORECAST_HORIZON)
+
+
+# Função para passar para as prontas as previsões do lote que já terminaram; devolve os ativos cuja previsão falhou
+def collect_finished(prontas, pendentes, n_days):
+    falhas = []
+    for symbol in [symbol for symbol, future in pendentes.items() if future.done()]:
+        if pendentes.pop(symbol).exception() is not None:
+            falhas.append(symbol)
+        else:
+            prontas[symbol] = forecast_store.load_forecast(symbol, n_days=n_days)
+    return falhas
+
+
+# Função para resumir as previsões prontas: último fechamento e valor previsto (com intervalo) ao fim do horizonte
+def forecast_table(closes, previsoes):
+    linhas = {}
+    for symbol, previsao in previsoes.items():
+        ultimo = closes[symbol].dropna().iloc[-1]
+        fim = previsao.iloc[-1]
+        linhas[symbol] = {
+            'último': ultimo,
+            'previsto': fim['yhat'],
+            'mínimo': fim['yhat_lower'],
+            'máximo': fim['yhat_upper'],
+            'variação (%)': (fim['yhat'] / ultimo - 1) * 100,
+        }
+    return pd.DataFrame.from_dict(linhas, orient='index')
@@ -0,0 +1,67 @@
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import config
+import database
+import forecast_cache
+import forecast_store
+import price_store
+
+# Processamento em lote (para rodar após o fechamento do mercado):
+# ajusta os modelos de todas as ações conhecidas em paralelo e grava as previsões no horizonte máximo.
+#
+#   python precompute_forecasts.py [--horizon 90] [--workers 4] [--symbols PETR4.SA VALE3.SA]
+
+
+# Função para listar as ações a processar: as disponíveis no site e todas as favoritadas
+def get_universe():
+    return sorted(set(config.AVAILABLE_ACTIONS) | set(database.get_all_favorite_symbols()))
+
+
+# Função executada em cada processo: atualiza o histórico, ajusta o modelo e calcula a previsão
+def forecast_symbol(symbol, horizon):
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    df = price_store.load_history(symbol, start=config.DATA_INICIO)
+    if df.empty:
+        raise ValueError(f"sem dados para {symbol}")
+    df_treino = df.reset_index()[['Date', 'Close']].rename(columns={"Date": 'ds', 'Close': 'y'})
+
+    modelo = forecast_cache.fit_model(df_treino, forecast_cache.PROPHET_CONFIG)
+    futuro = modelo.make_future_dataframe(periods=horizon, freq='B')
+    return df_treino['ds'].max(), modelo.predict(futuro)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pré-calcula as previsões de preço de todas as ações conhecidas.")
+    parser.add_argument('--horizon', type=int, default=config.FORECAST_HORIZON, help="dias úteis de previsão")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help="processos em paralelo")
+    parser.add_argument('--symbols', nargs='+', help="ações a processar (padrão: disponíveis + favoritas)")
+    args = parser.parse_args()
+
+    symbols = args.symbols or get_universe()
+    print(f"Processando {len(symbols)} ações com {args.workers} processos")
+    inicio = time.perf_counter()
+    falhas = 0
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(forecast_symbol, symbol, args.horizon): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                data_date, previsao = future.result()
+            except Exception as e:
+                falhas += 1
+                print(f"  {symbol}: erro - {e}")
+                continue
+            forecast_store.save_forecast(symbol, data_date, args.horizon, previsao)
+            print(f"  {symbol}: previsão gravada (dados até {data_date:%Y-%m-%d})")
+
+    print(f"Concluído em {time.perf_counter() - inicio:.1f}s ({falhas} falhas)")
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,427 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import date
+from itertools import repeat
+
+import pandas as pd
+
+import config
+import frame_cache
+import market_data
+import perf
+
+# Configuração do armazenamento local de preços
+PRICES_DB = "prices.db"
+# Intervalo mínimo (em segundos) entre duas consultas de atualização do mesmo ativo
+REFRESH_INTERVAL = 15 * 60
+COLUMNS = market_data.COLUMNS
+# Agregações (rollups) mantidas para cada ativo: período -> frequência do pandas, com o período rotulado pelo dia inicial
+ROLLUP_PERIODS = {'W': 'W-MON', 'M': 'MS', 'Y': 'YS'}
+ROLLUP_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'sum_close', 'bars']
+# Quantidade de cotações do dia mantidas para o gráfico do modo ao vivo (as mais recentes)
+LIVE_MAX_TICKS = 500
+
+_lock = threading.Lock()
+_last_refresh = {}
+# Versão dos dados de cada ativo neste processo, incrementada a cada gravação (invalida os DataFrames em cache)
+_versions = {}
+# Barra do dia em formação de cada ativo, montada com as cotações do modo ao vivo (ver live_quotes).
+# Fica só em memória: o pregão é gravado em prices pela atualização normal, e o histórico em cache
+# não é invalidado a cada cotação.
+_live_bars = {}
+# Últimas cotações do dia de cada ativo: deque de (horário, preço), com no máximo LIVE_MAX_TICKS itens
+_live_ticks = {}
+_initialized = False
+
+
+# Função para abrir uma conexão com o banco de preços (criando a tabela na primeira vez)
+@contextmanager
+def _connect():
+    global _initialized
+    conn = sqlite3.connect(PRICES_DB, timeout=30)
+    if not _initialized:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS prices (
+                symbol TEXT NOT NULL,
+                date TEXT NOT NULL,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL,
+                volume INTEGER,
+                PRIMARY KEY (symbol, date)
+            ) WITHOUT ROWID
+            """
+        )
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS rollups (
+                symbol TEXT NOT NULL,
+                period TEXT NOT NULL,
+                start TEXT NOT NULL,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL,
+                volume INTEGER,
+                sum_close REAL,
+                bars INTEGER,
+                PRIMARY KEY (symbol, period, start)
+            ) WITHOUT ROWID
+            """
+        )
+        _initialized = True
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+# Função para obter a data do último pregão armazenado de um ativo
+def last_stored_date(symbol):
+    with _connect() as conn:
+        row = conn.execute("SELECT MAX(date) FROM prices WHERE symbol = ?", (symbol,)).fetchone()
+    return date.fromisoformat(row[0]) if row and row[0] else None
+
+
+# Função para agregar barras (diárias ou já agregadas) em períodos maiores
+def _aggregate(bars, freq):
+    grupos = bars.resample(freq, label='left', closed='left')
+    agregado = pd.DataFrame({
+        'open': grupos['open'].first(),
+        'high': grupos['high'].max(),
+        'low': grupos['low'].min(),
+        'close': grupos['close'].last(),
+        'volume': grupos['volume'].sum(),
+        'sum_close': grupos['sum_close'].sum(),
+        'bars': grupos['bars'].sum(),
+    })
+    return agregado[agregado['bars'] > 0]
+
+
+# Função para refazer as agregações semanais, mensais e anuais de um ativo a partir de uma data (ou todas).
+# Só são refeitos os períodos que contêm barras a partir de since: a semana e o ano dela, com os meses desse ano.
+def _update_rollups(conn, symbol, since=None):
+    query = "SELECT date, open, high, low, close, volume FROM prices WHERE symbol = ?"
+    params = [symbol]
+    inicio = {}
+    if since is not None:
+        since = pd.Timestamp(since)
+        inicio = {'W': since - pd.Timedelta(days=since.weekday()), 'M': pd.Timestamp(since.year, 1, 1), 'Y': pd.Timestamp(since.year, 1, 1)}
+        query += " AND date >= ?"
+        params.append(min(inicio.values()).strftime('%Y-%m-%d'))
+    rows = conn.execute(query, params).fetchall()
+    if not rows:
+        return
+
+    diario = pd.DataFrame(rows, columns=['date', 'open', 'high', 'low', 'close', 'volume'])
+    diario.index = pd.to_datetime(diario.pop('date'))
+    diario['sum_close'] = diario['close']
+    diario['bars'] = 1
+    # Diário -> semanal e mensal; mensal -> anual
+    mensal = _aggregate(diario, ROLLUP_PERIODS['M'])
+    agregados = {'W': _aggregate(diario, ROLLUP_PERIODS['W']), 'M': mensal, 'Y': _aggregate(mensal, ROLLUP_PERIODS['Y'])}
+
+    registros = []
+    for period, frame in agregados.items():
+        if period in inicio:
+            frame = frame[frame.index >= inicio[period]]
+        registros += zip(repeat(symbol), repeat(period), frame.index.strftime('%Y-%m-%d'), *(frame[c].tolist() for c in ROLLUP_COLUMNS))
+    conn.executemany(f"INSERT OR REPLACE INTO rollups VALUES ({', '.join('?' * (len(ROLLUP_COLUMNS) + 3))})", registros)
+
+
+# Função para gravar (ou sobrescrever) pregões de um ativo
+def save_bars(symbol, df):
+    if df.empty:
+        return 0
+    index = pd.DatetimeIndex(df.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    valid = df['Close'].notna().to_numpy()
+    dates = index.strftime('%Y-%m-%d')[valid]
+    prices = df[['Open', 'High', 'Low', 'Close']].to_numpy(dtype=float)[valid].T.tolist()
+    volume = df['Volume'].fillna(0).to_numpy(dtype='int64')[valid].tolist()
+    rows = list(zip(repeat(symbol), dates, *prices, volume))
+    with _connect() as conn:
+        conn.executemany("INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+        # As agregações são atualizadas na mesma transação, apenas nos períodos tocados pelas novas barras
+        _update_rollups(conn, symbol, min(dates))
+        _ensure_rollups(conn, symbol)
+    with _lock:
+        _versions[symbol] = _versions.get(symbol, 0) + 1
+    frame_cache.discard(lambda key: key[:2] == ('history', symbol) or (key[0] == 'closes' and symbol in key[1]))
+    return len(rows)
+
+
+# Função para marcar os ativos que devem ser atualizados agora (respeitando REFRESH_INTERVAL)
+def _due_for_refresh(symbols, force=False):
+    now = time.monotonic()
+    due = []
+    with _lock:
+        for symbol in symbols:
+            checked_at = _last_refresh.get(symbol)
+            if force or not checked_at or now - checked_at >= REFRESH_INTERVAL:
+                _last_refresh[symbol] = now
+                due.append(symbol)
+    return due
+
+
+# Função para liberar uma nova tentativa de atualização dos ativos (após uma falha na busca)
+def _forget_refresh(symbols):
+    with _lock:
+        for symbol in symbols:
+            _last_refresh.pop(symbol, None)
+
+
+# Função para verificar se o trecho baixado traz dividendos ou desdobramentos depois do último pregão armazenado.
+# Os preços são gravados já ajustados; um evento novo muda o ajuste de todo o histórico anterior, que precisa
+# ser baixado de novo para não ficar um salto no preço.
+def _has_new_action(df, last):
+    acoes = [c for c in market_data.ACTION_COLUMNS if c in df.columns]
+    if not acoes or last is None:
+        return False
+    novos = df.loc[df.index > pd.Timestamp(last), acoes]
+    return bool((novos.fillna(0) != 0).to_numpy().any())
+
+
+# Função para buscar apenas os pregões que ainda não estão no armazenamento local
+# (ou o histórico completo, quando há um dividendo ou desdobramento novo)
+def refresh(symbol, force=False):
+    if not _due_for_refresh([symbol], force):
+        perf.count('price_store.hit')
+        return 0
+
+    last = last_stored_date(symbol)
+    perf.count('price_store.miss')
+    # O último pregão armazenado é buscado de novo, pois pode ter sido gravado com o dia ainda em aberto
+    # (o pregão de hoje muda até o fechamento e é refeito a cada REFRESH_INTERVAL)
+    start = last.isoformat() if last else config.DATA_INICIO
+    provider = market_data.get_provider()
+    try:
+        with perf.span(f'{provider.name}.history', symbol=symbol, start=start):
+            df = provider.history(symbol, start)
+        if _has_new_action(df, last):
+            perf.count('price_store.readjusted')
+            with perf.span(f'{provider.name}.history', symbol=symbol, start=config.DATA_INICIO):
+                df = provider.history(symbol, config.DATA_INICIO)
+        # Tamanho em memória dos pregões recebidos (o provedor não informa os bytes transferidos pela rede)
+        perf.count('fetched_frame_bytes', int(df.memory_usage(deep=True).sum()))
+        return save_bars(symbol, df)
+    except Exception:
+        # Sem isso, um ativo que falhou ficaria sem nova tentativa até passar REFRESH_INTERVAL
+        _forget_refresh([symbol])
+        raise
+
+
+# Função para atualizar vários ativos de uma vez, com no máximo duas chamadas em lote à fonte de dados
+# (uma para os ativos novos, com o histórico completo, e outra para o trecho que falta dos demais)
+def refresh_many(symbols, force=False):
+    symbols = list(dict.fromkeys(symbols))
+    due = _due_for_refresh(symbols, force)
+    perf.count('price_store.hit', len(symbols) - len(due))
+    if not due:
+        return 0
+
+    with _connect() as conn:
+        placeholders = ", ".join("?" * len(due))
+        last_dates = dict(conn.execute(
+            f"SELECT symbol, MAX(date) FROM prices WHERE symbol IN ({placeholders}) GROUP BY symbol", due
+        ).fetchall())
+
+    novos = [symbol for symbol in due if symbol not in last_dates]
+    # Os demais buscam a partir do último pregão armazenado, que pode ser o de hoje ainda em aberto
+    atrasados = [symbol for symbol in due if symbol in last_dates]
+
+    perf.count('price_store.miss', len(due))
+    provider = market_data.get_provider()
+    saved = 0
+    pendentes = set(novos) | set(atrasados)
+    try:
+        for group, start in ((novos, config.DATA_INICIO), (atrasados, min((last_dates[s] for s in atrasados), default=None))):
+            if not group:
+                continue
+            with perf.span(f'{provider.name}.download', symbols=len(group), start=start):
+                frames = provider.history_many(group, start)
+            # Ativos com dividendo ou desdobramento novo são baixados de novo por completo, em um lote só
+            reajustar = [symbol for symbol, df in frames.items() if symbol in last_dates and _has_new_action(df, last_dates[symbol])]
+            if reajustar:
+                perf.count('price_store.readjusted', len(reajustar))
+                with perf.span(f'{provider.name}.download', symbols=len(reajustar), start=config.DATA_INICIO):
+                    frames.update(provider.history_many(reajustar, config.DATA_INICIO))
+            for symbol, df in frames.items():
+                perf.count('fetched_frame_bytes', int(df.memory_usage(deep=True).sum()))
+                saved += save_bars(symbol, df)
+                pendentes.discard(symbol)
+    except Exception:
+        _forget_refresh(pendentes)
+        raise
+    return saved
+
+
+# Função para obter a versão dos dados de um ativo: a data do último pregão armazenado (que enxerga gravações
+# feitas por outros processos) e a quantidade de gravações neste processo. Atualiza o ativo antes, se for a hora.
+def data_version(symbol):
+    refresh(symbol)
+    return last_stored_date(symbol), _versions.get(symbol, 0)
+
+
+# Função para obter a versão dos dados de vários ativos (ver data_version), com uma única consulta
+def data_versions(symbols):
+    symbols = tuple(dict.fromkeys(symbols))
+    refresh_many(symbols)
+    with _connect() as conn:
+        last_dates = dict(conn.execute(
+            f"SELECT symbol, MAX(date) FROM prices WHERE symbol IN ({', '.join('?' * len(symbols))}) GROUP BY symbol", symbols
+        ).fetchall())
+    return tuple((last_dates.get(symbol), _versions.get(symbol, 0)) for symbol in symbols)
+
+
+# Função para ler o histórico de um ativo do banco
+def _query_history(symbol, start):
+    query = "SELECT date, open, high, low, close, volume FROM prices WHERE symbol = ?"
+    params = [symbol]
+    if start is not None:
+        query += " AND date >= ?"
+        params.append(start)
+    query += " ORDER BY date"
+    with _connect() as conn:
+        rows = conn.execute(query, params).fetchall()
+
+    df = pd.DataFrame(rows, columns=['Date'] + COLUMNS)
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df.set_index('Date')
+
+
+# Função para carregar o histórico de um ativo a partir do armazenamento local.
+# O DataFrame devolvido é compartilhado entre as sessões (copy-on-write, ver frame_cache).
+def load_history(symbol, start=None):
+    versao = data_version(symbol)
+    start = pd.Timestamp(start).strftime('%Y-%m-%d') if start is not None else None
+    key = ('history', symbol, start) + versao
+    return frame_cache.get_or_load(key, lambda: _query_history(symbol, start))
+
+
+# Função para refazer todas as agregações de um ativo cujas semanas não cobrem o primeiro pregão armazenado.
+# Isso acontece com ativos gravados antes da existência da tabela rollups: a primeira atualização só
+# agrega o ano das barras novas, e os anos anteriores ficariam de fora.
+def _ensure_rollups(conn, symbol):
+    primeiro, = conn.execute("SELECT MIN(date) FROM prices WHERE symbol = ?", (symbol,)).fetchone()
+    coberto, = conn.execute("SELECT MIN(start) FROM rollups WHERE symbol = ? AND period = 'W'", (symbol,)).fetchone()
+    if primeiro is not None and (coberto is None or coberto > primeiro):
+        _update_rollups(conn, symbol)
+
+
+# Função para carregar as barras agregadas de um ativo ('W', 'M' ou 'Y'), com a média do fechamento no período
+def load_rollup(symbol, period, start=None):
+    query = "SELECT start, open, high, low, close, volume, sum_close / bars FROM rollups WHERE symbol = ? AND period = ?"
+    params = [symbol, period]
+    if start is not None:
+        query += " AND start >= ?"
+        params.append(pd.Timestamp(start).strftime('%Y-%m-%d'))
+    query += " ORDER BY start"
+    with _connect() as conn:
+        _ensure_rollups(conn, symbol)
+        rows = conn.execute(query, params).fetchall()
+
+    df = pd.DataFrame(rows, columns=['Date'] + COLUMNS + ['Mean'])
+    df['Date'] = pd.to_datetime(df['Date'])
+    return df.set_index('Date')
+
+
+# Função para obter as estatísticas de um ativo a partir das agregações, sem percorrer as barras diárias:
+# média do fechamento na semana e no mês mais recentes e, nos últimos `months` meses, volume total, média, máxima e mínima
+def rollup_stats(symbol, months=60):
+    inicio = (pd.Timestamp.today() - pd.DateOffset(months=months)).strftime('%Y-%m-01')
+    with _connect() as conn:
+        _ensure_rollups(conn, symbol)
+        volume, media, maxima, minima = conn.execute(
+            "SELECT SUM(volume), SUM(sum_close) / SUM(bars), MAX(high), MIN(low) FROM rollups"
+            " WHERE symbol = ? AND period = 'M' AND start >= ?", (symbol, inicio)
+        ).fetchone()
+        recentes = dict(conn.execute(
+            "SELECT period, sum_close / bars FROM rollups AS r WHERE symbol = ? AND period IN ('W', 'M')"
+            " AND start = (SELECT MAX(start) FROM rollups WHERE symbol = r.symbol AND period = r.period)", (symbol,)
+        ).fetchall())
+    return {
+        'volume': volume,
+        'mean': media,
+        'high': maxima,
+        'low': minima,
+        'week_mean': recentes.get('W'),
+        'month_mean': recentes.get('M'),
+    }
+
+
+# Função para ler do banco os fechamentos de vários ativos
+def _query_closes(symbols, start):
+    query = f"SELECT date, symbol, close FROM prices WHERE symbol IN ({', '.join('?' * len(symbols))})"
+    params = list(symbols)
+    if start is not None:
+        query += " AND date >= ?"
+        params.append(start)
+    with _connect() as conn:
+        rows = conn.execute(query, params).fetchall()
+
+    closes = pd.DataFrame(rows, columns=['Date', 'symbol', 'Close']).pivot(index='Date', columns='symbol', values='Close')
+    closes.index = pd.to_datetime(closes.index)
+    closes.columns.name = None
+    return closes.reindex(columns=list(symbols)).sort_index()
+
+
+# Função para carregar os fechamentos de vários ativos, alinhados por data (uma coluna por ativo).
+# Como em load_history, o DataFrame devolvido é compartilhado entre as sessões (copy-on-write, ver frame_cache).
+def load_closes(symbols, start=None):
+    symbols = tuple(dict.fromkeys(symbols))
+    if not symbols:
+        return pd.DataFrame()
+    versao = data_versions(symbols)
+    start = pd.Timestamp(start).strftime('%Y-%m-%d') if start is not None else None
+    return frame_cache.get_or_load(('closes', symbols, start, versao), lambda: _query_closes(symbols, start))
+
+
+# Função para registrar uma cotação ao vivo na barra do dia do ativo
+def push_tick(symbol, tick):
+    dia = pd.Timestamp(tick['time']).normalize()
+    price = tick['price']
+    with _lock:
+        bar = _live_bars.get(symbol)
+        if bar is None or bar['Date'] != dia:
+            bar = {'Date': dia, 'Open': price, 'High': price, 'Low': price, 'ticks': 0}
+            _live_ticks[symbol] = deque(maxlen=LIVE_MAX_TICKS)
+        _live_ticks[symbol].append((tick['time'], price))
+        # Cada cotação gera um novo dicionário, para que as páginas leiam a barra sem trava
+        _live_bars[symbol] = dict(
+            bar, High=max(bar['High'], price), Low=min(bar['Low'], price), Close=price,
+            Volume=tick['volume'], time=tick['time'], ticks=bar['ticks'] + 1,
+        )
+
+
+# Função para obter a barra do dia em formação de um ativo (ou None, fora do modo ao vivo)
+def live_bar(symbol):
+    with _lock:
+        return _live_bars.get(symbol)
+
+
+# Função para obter as últimas cotações do dia de um ativo: (horários, preços)
+def live_ticks(symbol):
+    with _lock:
+        ticks = list(_live_ticks.get(symbol, ()))
+    return [t for t, _ in ticks], [p for _, p in ticks]
+
+
+# Função para obter o último preço e a variação percentual do dia de vários ativos
+def load_quotes(symbols):
+    closes = load_closes(symbols, start=pd.Timestamp.today() - pd.Timedelta(days=15))
+    quotes = pd.DataFrame(index=closes.columns, columns=['last', 'change'], dtype=float)
+    for symbol in closes.columns:
+        serie = closes[symbol].dropna()
+        if len(serie) >= 1:
+            quotes.loc[symbol, 'last'] = serie.iloc[-1]
+        if len(serie) >= 2:
+            quotes.loc[symbol, 'change'] = (serie.iloc[-1] / serie.iloc[-2] - 1) * 100
+    return quotes
@@ -0,0 +1,72 @@
+import threading
+from collections import Counter, OrderedDict
+
+import pandas as pd
+
+import perf
+
+# Memoização dos resultados das seções das páginas entre as execuções do script.
+# Cada interação com um widget executa site2.py inteiro de novo; cada seção guarda aqui o que calculou
+# (DataFrames, gráficos já montados e o tamanho deles serializados) sob uma chave com as entradas de que
+# depende (usuário, ativo, horizonte, versão dos dados...). Enquanto essas entradas não mudam, a seção
+# reaproveita o resultado e só a seção cuja entrada mudou é recalculada.
+# Os resultados são compartilhados entre as sessões do processo e não devem ser alterados por quem os recebe.
+MAX_ENTRIES = 256
+
+_lock = threading.Lock()
+# (seção, chave) -> resultado, em ordem de uso
+_entries = OrderedDict()
+# seção -> Counter com os acertos e erros desde o início do processo
+_stats = {}
+
+
+# Função para registrar um acerto ou erro da seção (no painel de desempenho e nos contadores da página)
+def _record(section, outcome):
+    with _lock:
+        _stats.setdefault(section, Counter())[outcome] += 1
+    perf.count(f'section_cache.{section}.{outcome}')
+
+
+# Função para obter o resultado de uma seção para a chave ou calculá-lo com compute() e guardá-lo
+def get_or_compute(section, key, compute):
+    full_key = (section, key)
+    with _lock:
+        found = full_key in _entries
+        if found:
+            _entries.move_to_end(full_key)
+            value = _entries[full_key]
+    if found:
+        _record(section, 'hit')
+        return value
+
+    _record(section, 'miss')
+    value = compute()
+    with _lock:
+        _entries[full_key] = value
+        _entries.move_to_end(full_key)
+        while len(_entries) > MAX_ENTRIES:
+            _entries.popitem(last=False)
+    return value
+
+
+# Função para descartar os resultados de uma seção cujas chaves satisfazem a condição (ou todos)
+def discard(section, predicate=None):
+    with _lock:
+        for full_key in [k for k in _entries if k[0] == section and (predicate is None or predicate(k[1]))]:
+            del _entries[full_key]
+
+
+# Função para obter os acertos e erros de cada seção, com a taxa de acerto e as entradas guardadas
+def stats():
+    with _lock:
+        contagens = {section: Counter(c) for section, c in _stats.items()}
+        entradas = Counter(section for section, _ in _entries)
+    if not contagens:
+        return pd.DataFrame()
+    df = pd.DataFrame({
+        'acertos': {section: c['hit'] for section, c in contagens.items()},
+        'erros': {section: c['miss'] for section, c in contagens.items()},
+        'entradas': {section: entradas[section] for section in contagens},
+    }).rename_axis('seção').sort_index()
+    df.insert(2, 'taxa de acerto', (df['acertos'] / (df['acertos'] + df['erros'])).round(3))
+    return df
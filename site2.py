@@ -1,53 +1,32 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-import yfinance as yf
-from sqlalchemy import create_engine, Column, String, Integer, MetaData, ForeignKey
-from sqlalchemy.orm import sessionmaker, relationship
-from sqlalchemy.ext.declarative import declarative_base
-from prophet import Prophet
-from prophet.plot import plot_plotly, plot_components_plotly
+import html
 from datetime import date
 
-Base = declarative_base()
-
-# Configuração do banco de dados
-DATABASE_URL = "sqlite:///users.db"
-engine = create_engine(DATABASE_URL)
-metadata = MetaData()
-
-# Definição da tabela de usuários
-class User(Base):
-    __tablename__ = 'users'
-    id = Column(Integer, primary_key=True)
-    username = Column(String, unique=True, nullable=False)
-    password = Column(String, nullable=False)
-    name = Column(String, nullable=False)
-    favorites = relationship("Favorite", back_populates="user")
-
-class Favorite(Base):
-    __tablename__ = 'favorites'
-    id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id'))
-    symbol = Column(String, nullable=False)
-    user = relationship("User", back_populates="favorites")
-
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
-session = Session()
-
-# Função para adicionar um usuário ao banco de dados
-def add_user(username, password, name):
-    if session.query(User).filter_by(username=username).first():
-        return False
-    new_user = User(username=username, password=password, name=name)
-    session.add(new_user)
-    session.commit()
-    return True
+import charts
+import comparison
+import config
+import downsampling
+import forecast_engines
+import forecast_plots
+import forecast_store
+import forecast_worker
+import frame_cache
+import fundamentals_cache
+import indicators
+import live_quotes
+import news_store
+import perf
+import portfolio
+import price_store
+import section_cache
+import startup
+from database import add_user, find_user, add_favorite, get_favorites
 
 # Função para verificar login
 def check_login(username, password):
-    user = session.query(User).filter_by(username=username, password=password).first()
+    user = find_user(username, password)
     if user:
         st.session_state.logged_in = True
         st.session_state.user_id = user.id
@@ -56,17 +35,6 @@ def check_login(username, password):
     else:
         st.error("Usuário ou senha incorretos")
 
-# Função para adicionar uma ação favorita
-def add_favorite(user_id, symbol):
-    if not session.query(Favorite).filter_by(user_id=user_id, symbol=symbol).first():
-        new_favorite = Favorite(user_id=user_id, symbol=symbol)
-        session.add(new_favorite)
-        session.commit()
-
-# Função para obter as ações favoritadas pelo usuário
-def get_favorites(user_id):
-    return session.query(Favorite).filter_by(user_id=user_id).all()
-
 # Página de login
 def login_page():
     st.title("Login")
@@ -94,11 +62,69 @@ def register_page():
 
 # Função para buscar e exibir dados da ação
 def get_stock_data(ticker):
-    stock = yf.Ticker(ticker)
-    hist = stock.history(period="5y")
-    info = stock.info
+    with perf.span('get_stock_data', symbol=ticker):
+        hist = price_store.load_history(ticker, start=pd.Timestamp.today() - pd.DateOffset(years=5))
+        info = fundamentals_cache.get_info(ticker)
     return hist, info
 
+# Função para obter os símbolos das favoritas do usuário, reaproveitados entre as execuções até ele adicionar outra
+def favorite_symbols(user_id):
+    return section_cache.get_or_compute('favorites', user_id, lambda: tuple(favorite.symbol for favorite in get_favorites(user_id)))
+
+# Função para adicionar uma favorita e descartar a lista guardada do usuário
+def add_to_favorites(user_id, symbol):
+    add_favorite(user_id, symbol)
+    section_cache.discard('favorites', lambda key: key == user_id)
+
+# Função para formatar o último preço e a variação do dia de uma ação favorita
+def format_quote(quotes, symbol):
+    if quotes is None or symbol not in quotes.index or pd.isna(quotes.loc[symbol, 'last']):
+        return "Cotação indisponível"
+    text = f"{quotes.loc[symbol, 'last']:.2f}"
+    change = quotes.loc[symbol, 'change']
+    if pd.notna(change):
+        color = 'limegreen' if change >= 0 else 'tomato'
+        text += f' <span style="color: {color};">({change:+.2f}%)</span>'
+    return text
+
+# Função para descrever há quanto tempo uma notícia foi publicada
+def format_published(published):
+    minutos = int((pd.Timestamp.now(tz='UTC').tz_localize(None) - published).total_seconds() // 60)
+    if minutos < 60:
+        return f"há {max(minutos, 1)} min"
+    if minutos < 24 * 60:
+        return f"há {minutos // 60} h"
+    dias = minutos // (24 * 60)
+    return f"há {dias} dia" if dias == 1 else f"há {dias} dias"
+
+# Função para renderizar os cartões de notícias de uma página em um único bloco de markdown
+def render_news_cards(artigos):
+    cards = []
+    for artigo in artigos:
+        titulo = html.escape(artigo['title'])
+        # Só links http(s) viram âncora; notícias gravadas antes da validação podem ter outros esquemas
+        url = news_store.safe_url(artigo['url'])
+        if url:
+            titulo = f'<a href="{html.escape(url)}" target="_blank" rel="noopener noreferrer">{titulo}</a>'
+        resumo = f"<p>{html.escape(artigo['summary'])}</p>" if artigo['summary'] else ""
+        # Sem recuo nem linhas em branco, para que o markdown trate todos os cartões como um único bloco HTML
+        cards.append(
+            '<div class="news-card">'
+            f'<div class="news-header"><h4>{html.escape(artigo["source"] or "")}</h4>'
+            f'<span class="time">{format_published(artigo["published"])}</span></div>'
+            f'<div class="news-content"><p><strong>{html.escape(artigo["symbol"])}</strong></p><p>{titulo}</p>{resumo}</div>'
+            f'<div class="news-footer"><span class="stars">{"⭐" * artigo["stars"]}</span></div>'
+            '</div>'
+        )
+    st.markdown("".join(cards), unsafe_allow_html=True)
+
+# Função para montar o gráfico de fechamento com os indicadores, junto com o tamanho dele serializado e a legenda
+def build_price_chart(ticker, hist, periodo, selected):
+    ind = indicators.get_indicators(ticker, hist)
+    with perf.span('plot.price'):
+        fig, n_visible = charts.price_chart(ticker, hist, ind, periodo, selected)
+    return fig, downsampling.payload_size(fig), downsampling.describe_payload(fig, n_visible)
+
 # Função para renderizar dados da ação com plotly
 def render_stock_data(ticker):
     try:
@@ -106,19 +132,35 @@ def render_stock_data(ticker):
         if hist.empty:
             st.error("Não há dados disponíveis para esta ação.")
             return
+        # Os gráficos e as estatísticas só são recalculados quando os dados do ativo ou os widgets da seção mudam
+        versao = price_store.data_version(ticker)
+
+        # Gráfico de fechamento ajustado com plotly, reduzido a no máximo downsampling.MAX_POINTS pontos
+        periodo = st.select_slider("Período", options=list(charts.PERIODOS), value='5A', key="periodo")
+        intervalo = st.radio("Intervalo", list(charts.INTERVALOS), horizontal=True, key="intervalo")
+        if charts.INTERVALOS[intervalo] is None:
+            selected = st.multiselect("Indicadores", list(indicators.OVERLAYS) + list(indicators.PANELS), key="indicators")
+            ao_vivo = st.toggle("Modo ao vivo", key="live")
+            fig, tamanho, legenda = section_cache.get_or_compute(
+                'price_chart', (ticker, versao, date.today(), periodo, tuple(selected)), lambda: build_price_chart(ticker, hist, periodo, selected)
+            )
+            perf.count('chart_bytes', tamanho)
+            st.plotly_chart(fig)
+            st.caption(legenda)
+            if ao_vivo:
+                # O histórico é desenhado uma vez; só as cotações do dia são redesenhadas a cada atualização
+                render_live_quote(ticker, hist)
+        else:
+            # Intervalos maiores vêm das agregações já calculadas, sem reagrupar o histórico diário
+            inicio = hist.index[-1] - charts.PERIODOS[periodo]
+            fig = section_cache.get_or_compute(
+                'rollup_chart', (ticker, versao, intervalo, periodo),
+                lambda: charts.rollup_chart(ticker, price_store.load_rollup(ticker, charts.INTERVALOS[intervalo], start=inicio), intervalo)
+            )
+            st.plotly_chart(fig)
 
-        # Gráfico de fechamento ajustado com plotly
-        fig = go.Figure()
-        fig.add_trace(go.Scatter(x=hist.index, y=hist['Close'], mode='lines', name='Fechamento Ajustado', line=dict(color='green')))
-        fig.update_layout(
-            title=f'Preço de Fechamento - {ticker}',
-            xaxis_title='Data',
-            yaxis_title='Preço de Fechamento Ajustado',
-            template='plotly_dark'
-        )
-        st.plotly_chart(fig)
-
-        # Estatísticas adicionais
+        # Estatísticas adicionais (as de preço e volume vêm das agregações mantidas em price_store)
+        stats = section_cache.get_or_compute('rollup_stats', (ticker, versao, date.today()), lambda: price_store.rollup_stats(ticker))
         st.subheader("Estatísticas")
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -134,44 +176,151 @@ def render_stock_data(ticker):
             st.metric(label="Dividend Yield", value=f"{info.get('dividendYield', 'N/A') * 100:.2f}%")
             st.metric(label="Return on Equity (ROE)", value=f"{info.get('returnOnEquity', 'N/A') * 100:.2f}%")
         with col3:
-            st.metric(label="Volume Total", value=f"{hist['Volume'].sum():,}")
-            st.metric(label="Média de Preço (Mês)", value=f"{hist['Close'].resample('M').mean().iloc[-1]:.2f}")
-            st.metric(label="Média de Preço (Semana)", value=f"{hist['Close'].resample('W').mean().iloc[-1]:.2f}")
-            st.metric(label="Média de Preço (Dia)", value=f"{hist['Close'].mean():.2f}")
-            st.metric(label="Maior Preço do Dia", value=f"{hist['High'].max():.2f}")
-            st.metric(label="Menor Preço do Dia", value=f"{hist['Low'].min():.2f}")
+            st.metric(label="Volume Total", value=f"{stats['volume']:,}")
+            st.metric(label="Média de Preço (Mês)", value=f"{stats['month_mean']:.2f}")
+            st.metric(label="Média de Preço (Semana)", value=f"{stats['week_mean']:.2f}")
+            st.metric(label="Média de Preço (Dia)", value=f"{stats['mean']:.2f}")
+            st.metric(label="Maior Preço do Dia", value=f"{stats['high']:.2f}")
+            st.metric(label="Menor Preço do Dia", value=f"{stats['low']:.2f}")
 
     except Exception as e:
         st.error(f"Erro ao obter dados da ação: {e}")
 
-# Função para renderizar a previsão de preços
-def render_price_forecast(ticker, n_days):
+# Função para carregar o histórico usado no treino do modelo de previsão (reaproveitado enquanto os dados do ativo não mudam)
+def load_forecast_data(ticker):
+    chave = (ticker, date.today(), price_store.data_version(ticker))
+    return section_cache.get_or_compute('forecast_data', chave, lambda: read_forecast_data(ticker))
+
+# Função para ler o histórico de treino até o último pregão fechado
+def read_forecast_data(ticker):
+    df = price_store.load_history(ticker, start=config.DATA_INICIO)
+    df = df[df.index < pd.Timestamp(date.today())]
+    df.reset_index(inplace=True)
+
+    df_treino = df[['Date', 'Close']]
+    df_treino = df_treino.rename(columns={"Date": 'ds', 'Close': 'y'})
+    return df, df_treino
+
+# Função para obter a previsão pré-calculada pelo processamento em lote, se ela estiver em dia
+def get_stored_forecast(ticker, df_treino, n_days=None):
+    return forecast_store.load_forecast(ticker, min_data_date=df_treino['ds'].max(), n_days=n_days)
+
+# Função para renderizar o modo ao vivo: só este trecho é executado a cada config.LIVE_POLL_INTERVAL segundos,
+# com os indicadores da cotação atual e o gráfico das cotações do dia (o gráfico do histórico não é reenviado)
+@st.fragment(run_every=config.LIVE_POLL_INTERVAL)
+def render_live_quote(ticker, hist):
+    with perf.page_render("Ações (ao vivo)"):
+        live_quotes.subscribe(ticker)
+        bar = price_store.live_bar(ticker)
+        if bar is None:
+            st.info("Aguardando a primeira cotação...")
+            return
+
+        anteriores = hist['Close'].iloc[:hist.index.searchsorted(bar['Date'])]
+        anterior = anteriores.iloc[-1] if len(anteriores) else None
+        variacao = f"{(bar['Close'] / anterior - 1) * 100:+.2f}%" if anterior is not None else None
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric(label="Preço Atual", value=f"{bar['Close']:.2f}", delta=variacao)
+        col2.metric(label="Máxima do Dia", value=f"{bar['High']:.2f}")
+        col3.metric(label="Mínima do Dia", value=f"{bar['Low']:.2f}")
+        col4.metric(label="Volume do Dia", value=f"{bar['Volume']:,}")
+        with perf.span('plot.live'):
+            fig = charts.live_chart(ticker, *price_store.live_ticks(ticker), anterior)
+        perf.count('chart_bytes', downsampling.payload_size(fig))
+        st.plotly_chart(fig)
+        st.caption(f"Atualizado às {bar['time']:%H:%M:%S} ({bar['ticks']} cotações)")
+
+# Função para montar o gráfico de comparação a partir das séries alinhadas, com o tamanho dele serializado e a legenda
+def build_comparison(alinhado, ticker, base, janela):
+    with perf.span('comparison', symbols=len(alinhado.columns)):
+        normalizado = comparison.normalize(alinhado, base)
+        relativo = comparison.relative_performance(normalizado, ticker)
+        correlacao = comparison.rolling_correlation(alinhado, ticker, janela)
+        fig = charts.comparison_chart(normalizado, relativo, correlacao, ticker)
+    ultimo = normalizado.ffill().iloc[-1]
+    legenda = "Desde a data base: " + ", ".join(f"{symbol} {valor - 100:+.1f}%" for symbol, valor in ultimo.items())
+    return fig, downsampling.payload_size(fig), legenda
+
+# Função para renderizar a comparação do ativo com outros: todos carregados em uma única consulta, alinhados
+# em um calendário comum e desenhados em um único gráfico
+def render_comparison(ticker, outros):
+    symbols = [ticker] + outros
+    col1, col2, col3 = st.columns(3)
+    # Ao trocar o período, a data base volta ao início do novo período
+    periodo = col1.select_slider("Período da comparação", options=list(charts.PERIODOS), value='1A', key="periodo_comparacao",
+                                 on_change=lambda: st.session_state.pop("data_base", None))
+    calendario = col2.radio("Calendário", list(comparison.CALENDARIOS), format_func=comparison.CALENDARIOS.get, key="calendario")
+    janela = col3.slider("Janela da correlação (pregões)", 20, 120, 60, key="janela_correlacao")
+    try:
+        inicio = pd.Timestamp.today().normalize() - charts.PERIODOS[periodo]
+        chave = (tuple(symbols), price_store.data_versions(symbols), inicio, calendario, janela)
+        # O histórico começa uma janela antes da data base, para a correlação já estar definida nela
+        alinhado = section_cache.get_or_compute('comparison_data', chave, lambda: comparison.align(
+            price_store.load_closes(symbols, start=inicio - pd.DateOffset(days=2 * janela)), calendario
+        ))
+        base = st.date_input("Data base", value=inicio.date(), min_value=alinhado.index[0].date(), max_value=alinhado.index[-1].date(), key="data_base")
+        fig, tamanho, legenda = section_cache.get_or_compute(
+            'comparison_chart', chave + (base,), lambda: build_comparison(alinhado, ticker, base, janela)
+        )
+        perf.count('chart_bytes', tamanho)
+        st.plotly_chart(fig)
+        st.caption(legenda)
+    except Exception as e:
+        st.error(f"Erro ao comparar ações: {e}")
+
+# Função para iniciar o ajuste do modelo em segundo plano, antes de renderizar o restante da página
+def start_price_forecast(ticker):
     try:
-        DATA_INICIO = '2017-01-01'
-        DATA_FIM = date.today().strftime('%Y-%m-%d')    
+        _, df_treino = load_forecast_data(ticker)
+        if get_stored_forecast(ticker, df_treino) is None:
+            forecast_worker.submit_fit(ticker, df_treino)
+    except Exception:
+        # O erro é exibido no painel de previsão, que repete a operação
+        pass
+
+# Função para obter o motor de previsão de um ativo: o escolhido na página ou, antes disso, o padrão do ativo
+def selected_engine(ticker):
+    return st.session_state.get(f"motor_{ticker}") or forecast_engines.default_engine(ticker)
+
+# Função para calcular a previsão de um ativo e montar a tabela e os gráficos dela
+def build_price_forecast(ticker, df_treino, n_days, motor):
+    if motor == 'prophet':
+        previsao = get_stored_forecast(ticker, df_treino, n_days)
+        if previsao is None:
+            job = forecast_worker.submit(ticker, df_treino, n_days)
+            with st.spinner('Calculando previsão...'), perf.span('forecast.wait', symbol=ticker):
+                _, previsao = job.result()
+    else:
+        # Os motores rápidos são calculados na hora, em milissegundos
+        previsao = forecast_engines.predict(motor, ticker, df_treino, n_days)
+
+    with perf.span('plot.forecast'):
+        grafico1 = forecast_plots.plot_forecast(df_treino, previsao)
+        grafico2 = forecast_plots.plot_components(previsao)
+    tabela = previsao[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].tail(n_days)
+    tamanho = downsampling.payload_size(grafico1) + downsampling.payload_size(grafico2)
+    return tabela, grafico1, grafico2, tamanho, downsampling.describe_payload(grafico1, len(previsao))
 
-        df = yf.download(ticker, DATA_INICIO, DATA_FIM)
-        df.reset_index(inplace=True)
+# Função para renderizar a previsão de preços
+def render_price_forecast(ticker, n_days, motor='prophet'):
+    try:
+        df, df_treino = load_forecast_data(ticker)
 
         st.subheader('Tabela de valores - ' + ticker)
         st.write(df.tail(10))
 
-        df_treino = df[['Date', 'Close']]
-        df_treino = df_treino.rename(columns={"Date": 'ds', 'Close': 'y'})
-
-        modelo = Prophet()
-        modelo.fit(df_treino)
-
-        futuro = modelo.make_future_dataframe(periods=n_days, freq='B')
-        previsao = modelo.predict(futuro)
+        # A previsão e os gráficos só são recalculados quando o ativo, o horizonte, o motor ou os dados mudam
+        chave = (ticker, n_days, motor, df_treino['ds'].iloc[-1], price_store.data_version(ticker))
+        tabela, grafico1, grafico2, tamanho, legenda = section_cache.get_or_compute(
+            'forecast', chave, lambda: build_price_forecast(ticker, df_treino, n_days, motor)
+        )
 
         st.subheader('Previsão')
-        st.write(previsao[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].tail(n_days))
+        st.write(tabela)
 
-        grafico1 = plot_plotly(modelo, previsao)
+        perf.count('chart_bytes', tamanho)
         st.plotly_chart(grafico1)
-
-        grafico2 = plot_components_plotly(modelo, previsao)
+        st.caption(legenda)
         st.plotly_chart(grafico2)
 
     except Exception as e:
@@ -199,165 +348,232 @@ def select_action(action):
     st.session_state.selected_action = action
     set_page("Ações")
 
-# Estilo personalizado
-st.markdown(
-    """
-    <style>
-    :root {
-        --primary-color: #000005;
-        --secondary-color: #404040;
-        --highlight-color: #2E2E2E;
-        --text-color: white;
-        --font-size-small: 0.8rem;
-        --font-size-medium: 1rem;
-        --font-size-large: 1.2rem;
-    }
-    
-    body {
-        font-family: 'Arial', sans-serif;
-        color: var(--text-color);
-    }
-    
-    .sidebar .sidebar-content {
-        background-color: var(--primary-color);
-        color: var(--text-color);
-    }
-    .css-1d391kg {
-        background-color: var(primary-color);
-    }
-    .css-1aumxhk {
-        background-color: var(primary-color);
-    }
-    .main .block-container {
-        background-color: var(primary-color);
-        color: var(--text-color);
-    }
-    .stTextInput>div>div>input {
-        color: var(--text-color);
-    }
-    .block-container {
-        padding-top: 1rem;
-        padding-bottom: 1rem;
-    }
-    .css-1aumxhk {
-        padding-top: 1rem;
-    }
-    .css-145kmo2 {
-        display: none;
-    }
-    .stButton>button {
-        background-color: var(--highlight-color);
-        color: var(--text-color);
-        border: none;
-        border-radius: 10px;
-        padding: 10px;
-        font-size: 16px;
-    }
-    .card {
-        background-color: var(--secondary-color);
-        padding: 1rem;
-        border-radius: 10px;
-        margin-bottom: 1rem;
-        display: flex;
-        align-items: center;
-        cursor: pointer;
-    }
-    .card img {
-        width: 50px;
-        height: 50px;
-        margin-right: 1rem;
-    }
-    .card-content {
-        font-size: var(--font-size-medium);
-        margin-bottom: 0.5rem;
-    }
-    .card-footer {
-        text-align: right;
-        font-size: var(--font-size-small);
-    }
-    .news-card {
-        background-color: var(--secondary-color);
-        padding: 1rem;
-        border-radius: 10px;
-        margin-bottom: 1rem;
-    }
-    .news-header {
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-    }
-    .news-header h4 {
-        margin: 0;
-    }
-    .news-header .time {
-        font-size: var(--font-size-small);
-        color: #999;
-    }
-    .news-content {
-        margin-top: 0.5rem;
-        font-size: var(--font-size-small);
-    }
-    .news-footer {
-        display: flex;
-        justify-content: space-between;
-        align-items: center;
-        margin-top: 0.5rem;
-    }
-    .news-footer .stars {
-        color: gold;
-    }
-    .favorite-card {
-        background-color: var(--secondary-color);
-        padding: 1rem;
-        border-radius: 10px;
-        margin-bottom: 1rem;
-        display: flex;
-        align-items: center;
-        cursor: pointer;
-    }
-    .favorite-card img {
-        width: 50px;
-        height: 50px;
-        margin-right: 1rem;
-    }
-    .favorite-card .favorite-content {
-        display: flex;
-        flex-direction: column;
-    }
-    .favorite-card .favorite-header {
-        font-size: var(--font-size-large);
-        font-weight: bold;
-        margin: 0;
-    }
-    .favorite-card .favorite-description {
-        font-size: var(--font-size-medium);
-        color: #aaa;
-    }
-    
-    /* Responsividade */
-    @media (max-width: 768px) {
-        .stButton>button {
-            font-size: 14px;
-            padding: 8px;
-        }
-        .card-content {
-            font-size: var(--font-size-small);
-        }
-        .favorite-card .favorite-header {
-            font-size: var(--font-size-medium);
-        }
-    }
-    </style>
-    """,
-    unsafe_allow_html=True
-)
+# Estilo personalizado (lido de style.css uma única vez por processo, e não a cada execução da página)
+@st.cache_resource
+def load_css():
+    with open("style.css", encoding="utf-8") as f:
+        return f"<style>\n{f.read()}</style>"
+
+st.markdown(load_css(), unsafe_allow_html=True)
+
+# Página inicial
+def home_page():
+    st.session_state.page = "Página Inicial"
+    st.title(f"Página Inicial - Bem-vindo, {st.session_state.name}")
+
+    col1, col2 = st.columns((2, 1))
+
+    with col1:
+        st.header("Lista de Ações")
+        for stock in config.AVAILABLE_ACTIONS:
+            if st.button(stock, key=f"add_{stock}"):
+                add_to_favorites(st.session_state.user_id, stock)
+
+        st.header("Favoritas")
+        favorites = favorite_symbols(st.session_state.user_id)
+        # Cotações de todas as favoritas buscadas em lote, em vez de uma requisição por ação
+        try:
+            quotes = price_store.load_quotes(favorites)
+        except Exception as e:
+            quotes = None
+            st.warning(f"Não foi possível atualizar as cotações: {e}")
+        for symbol in favorites:
+            st.markdown(
+                f"""
+                <div class="favorite-card">
+                    <img src="https://via.placeholder.com/50?text={symbol}" alt="{symbol}">
+                    <div class="favorite-content">
+                        <span class="favorite-header">{symbol}</span>
+                        <span class="favorite-description">{format_quote(quotes, symbol)}</span>
+                    </div>
+                </div>
+                """,
+                unsafe_allow_html=True
+            )
+            if st.button(symbol, key=f"fav_{symbol}"):
+                select_action(symbol)
+
+    with col2:
+        st.header("Notícias")
+        # Notícias das favoritas (ou das ações disponíveis, para quem ainda não tem favoritas)
+        simbolos = list(favorites) or config.AVAILABLE_ACTIONS
+        try:
+            news_store.refresh(simbolos)
+        except Exception as e:
+            st.warning(f"Não foi possível atualizar as notícias: {e}")
+        artigos, _ = news_store.query(simbolos, page_size=5)
+        render_news_cards(artigos)
+        st.button("See All", on_click=set_page, args=("Notícias",), use_container_width=True)
+
+# Página de notícias
+def news_page():
+    st.session_state.page = "Notícias"
+    st.title("Notícias")
+
+    # Ao trocar o filtro, a paginação volta para a primeira página
+    selecionados = st.multiselect("Filtrar por ação", config.AVAILABLE_ACTIONS, key="news_symbols", on_change=lambda: st.session_state.update(news_page=0))
+    simbolos = selecionados or config.AVAILABLE_ACTIONS
+    try:
+        news_store.refresh(simbolos)
+    except Exception as e:
+        st.warning(f"Não foi possível atualizar as notícias: {e}")
+
+    pagina = st.session_state.get('news_page', 0)
+    artigos, total = news_store.query(simbolos, page=pagina)
+    paginas = max(1, -(-total // news_store.PAGE_SIZE))
+    if pagina >= paginas:
+        pagina = st.session_state.news_page = paginas - 1
+        artigos, total = news_store.query(simbolos, page=pagina)
+
+    if not artigos:
+        st.info("Nenhuma notícia encontrada.")
+        return
+    render_news_cards(artigos)
+
+    col1, col2, col3 = st.columns(3)
+    col1.button("Anterior", disabled=pagina == 0, on_click=lambda: st.session_state.update(news_page=pagina - 1))
+    col2.caption(f"Página {pagina + 1} de {paginas} ({total} notícias)")
+    col3.button("Próxima", disabled=pagina + 1 >= paginas, on_click=lambda: st.session_state.update(news_page=pagina + 1))
+
+# Página de ações
+def stocks_page():
+    st.session_state.page = "Ações"
+    st.title("Ações")
+    st.header(st.session_state.selected_action)
+
+    # Dropdown para selecionar outra ação
+    new_action = st.selectbox("Selecione uma ação", config.AVAILABLE_ACTIONS, index=config.AVAILABLE_ACTIONS.index(st.session_state.selected_action))
+    if new_action != st.session_state.selected_action:
+        select_action(new_action)
+        st.experimental_rerun()
+
+    # O modelo do Prophet é ajustado em segundo plano enquanto o gráfico e as estatísticas são exibidos
+    motor = selected_engine(new_action)
+    if motor == 'prophet':
+        start_price_forecast(new_action)
+
+    # Obter dados da ação
+    render_stock_data(new_action)
+
+    # Comparação com outras ações
+    outros = st.multiselect("Comparar com", [symbol for symbol in config.AVAILABLE_ACTIONS if symbol != new_action], key="comparar")
+    if outros:
+        render_comparison(new_action, outros)
+
+    # Previsão de preços
+    n_days = st.slider('Quantidade de dias de previsão', 30, config.FORECAST_HORIZON)
+    motores = list(forecast_engines.ENGINES)
+    motor = st.selectbox("Modelo de previsão", motores, index=motores.index(motor), format_func=lambda name: forecast_engines.ENGINES[name].label, key=f"motor_{new_action}")
+    render_price_forecast(new_action, n_days, motor)
+
+# Função para exibir a tabela das previsões prontas do lote da carteira, com o andamento e as falhas
+def render_forecast_table(closes, lote):
+    prontas, pendentes, falhas = lote['prontas'], lote['pendentes'], lote['falhas']
+    if prontas:
+        st.dataframe(portfolio.forecast_table(closes, prontas).style.format(precision=2))
+    if pendentes:
+        st.caption(f"Calculando previsões: {len(prontas)} de {len(prontas) + len(pendentes)} prontas")
+    if falhas:
+        st.warning(f"Não foi possível calcular a previsão de: {', '.join(falhas)}")
+
+# Função para acompanhar o lote da carteira: só este trecho é executado a cada config.PORTFOLIO_POLL_INTERVAL
+# segundos, movendo para a tabela as previsões que terminaram. Quando o lote acaba, a página é executada de novo
+# para exibir a tabela final sem o fragmento.
+@st.fragment(run_every=config.PORTFOLIO_POLL_INTERVAL)
+def poll_portfolio_forecast(closes):
+    with perf.page_render("Carteira (previsões)"):
+        lote = st.session_state.lote_carteira
+        lote['falhas'] += portfolio.collect_finished(lote['prontas'], lote['pendentes'], lote['chave'][2])
+        render_forecast_table(closes, lote)
+    if not lote['pendentes']:
+        st.rerun()
+
+# Função para renderizar as previsões da carteira: as prontas aparecem na hora e as do lote em andamento são
+# acompanhadas por um fragmento, sem prender a execução da página. O lote fica na sessão, para que as
+# execuções seguintes não o peçam de novo (nem repitam os ativos que falharam).
+def render_portfolio_forecast(closes, n_days, motor):
+    chave = (tuple(closes.columns), closes.index[-1], n_days, motor)
+    lote = st.session_state.get('lote_carteira')
+    if lote is None or lote['chave'] != chave:
+        prontas, pendentes = portfolio.batch_forecast(closes, n_days, motor)
+        lote = st.session_state.lote_carteira = {'chave': chave, 'prontas': prontas, 'pendentes': pendentes, 'falhas': []}
+    if lote['pendentes']:
+        poll_portfolio_forecast(closes)
+    else:
+        render_forecast_table(closes, lote)
+
+# Função para calcular o risco da carteira na janela escolhida e montar o mapa de correlação
+def build_risk(closes, periodo, confianca):
+    janela = closes[closes.index >= closes.index[-1] - charts.PERIODOS[periodo]]
+    with perf.span('portfolio.risk', symbols=len(closes.columns)):
+        risco = portfolio.risk_summary(portfolio.align_returns(janela), confidence=confianca)
+    return risco, charts.correlation_heatmap(risco['corr'])
+
+# Página da carteira de favoritas
+def portfolio_page():
+    st.session_state.page = "Carteira"
+    st.title("Carteira de Favoritas")
+
+    symbols = list(favorite_symbols(st.session_state.user_id))
+    if not symbols:
+        st.info("Adicione ações às favoritas na página inicial para montar a carteira.")
+        return
+
+    try:
+        # Uma única consulta para todos os ativos, usada tanto na análise de risco quanto no treino das previsões
+        with perf.span('portfolio.load', symbols=len(symbols)):
+            closes = price_store.load_closes(symbols, start=config.DATA_INICIO)
+    except Exception as e:
+        st.error(f"Erro ao obter dados da carteira: {e}")
+        return
+
+    periodo = st.select_slider("Janela", options=list(charts.PERIODOS), value='1A', key="janela_carteira")
+    confianca = st.radio("Confiança do VaR", [0.95, 0.99], format_func=lambda c: f"{c:.0%}", horizontal=True)
+    chave = (tuple(symbols), price_store.data_versions(symbols), periodo, confianca)
+    risco, heatmap = section_cache.get_or_compute('portfolio_risk', chave, lambda: build_risk(closes, periodo, confianca))
+
+    if risco['ativos'].empty:
+        st.info("Não há pregões suficientes na janela escolhida para calcular o risco da carteira.")
+    else:
+        st.caption("Pesos iguais para todas as favoritas.")
+        col1, col2, col3 = st.columns(3)
+        col1.metric(label="Volatilidade Anual", value=f"{risco['volatilidade'] * 100:.2f}%")
+        col2.metric(label="VaR de 1 Dia (paramétrico)", value=f"{risco['var_parametrico'] * 100:.2f}%")
+        col3.metric(label="VaR de 1 Dia (histórico)", value=f"{risco['var_historico'] * 100:.2f}%")
+        st.dataframe(risco['ativos'].style.format(precision=2))
+        st.plotly_chart(heatmap)
+
+    st.subheader("Previsões")
+    n_days = st.slider('Quantidade de dias de previsão', 30, config.FORECAST_HORIZON, key="dias_carteira")
+    motores = list(forecast_engines.ENGINES)
+    motor = st.selectbox("Modelo de previsão", motores, index=motores.index(config.PORTFOLIO_FORECAST_ENGINE), format_func=lambda name: forecast_engines.ENGINES[name].label, key="motor_carteira")
+    render_portfolio_forecast(closes, n_days, motor)
+
+# Painel de desempenho (somente administradores)
+def admin_panel():
+    st.header("Desempenho")
+    records = perf.load_page_records()
+    if not records:
+        st.info("Nenhuma medição registrada ainda.")
+        return
+    paginas, spans = perf.latency_summary(records)
+    st.subheader("Latência por página")
+    st.dataframe(paginas)
+    st.subheader("Latência por etapa")
+    st.dataframe(spans)
+    st.subheader("Cache e dados baixados")
+    st.dataframe(perf.counter_summary(records))
+    uso = frame_cache.stats()
+    st.caption(f"Cache de DataFrames: {uso['entries']} entradas, {uso['bytes'] / 2**20:.1f} MB de {config.FRAME_CACHE_BUDGET_MB} MB")
+    st.subheader("Seções reaproveitadas entre execuções")
+    st.dataframe(section_cache.stats())
 
 # Menu lateral com a logo
 st.sidebar.image("logo.png", use_column_width=True, width=150)  # Ajustar o tamanho da imagem para 150 pixels de largura
 st.sidebar.title("Menu")
 
 # Botões na aba lateral
-page = st.sidebar.radio("Ir para", ["Página Inicial", "Notícias", "Ações"], index=["Página Inicial", "Notícias", "Ações"].index(st.session_state.page))
+page = st.sidebar.radio("Ir para", ["Página Inicial", "Notícias", "Ações", "Carteira"], index=["Página Inicial", "Notícias", "Ações", "Carteira"].index(st.session_state.page))
 
 if not st.session_state.logged_in:
     if st.session_state.show_register:
@@ -365,146 +581,19 @@ if not st.session_state.logged_in:
     else:
         login_page()
 else:
-    if page == "Página Inicial":
-        st.session_state.page = "Página Inicial"
-        st.title(f"Página Inicial - Bem-vindo, {st.session_state.name}")
-
-        col1, col2 = st.columns((2, 1))
-        
-        with col1:
-            st.header("Lista de Ações")
-            available_actions = ["BBAS3.SA", "PETR4.SA", "VALE3.SA", "AAPL", "TSLA"]
-            for stock in available_actions:
-                if st.button(stock, key=f"add_{stock}"):
-                    add_favorite(st.session_state.user_id, stock)
-            
-            st.header("Favoritas")
-            favorites = get_favorites(st.session_state.user_id)
-            for favorite in favorites:
-                st.markdown(
-                    f"""
-                    <div class="favorite-card">
-                        <img src="https://via.placeholder.com/50?text={favorite.symbol}" alt="{favorite.symbol}">
-                        <div class="favorite-content">
-                            <span class="favorite-header">{favorite.symbol}</span>
-                        </div>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-                if st.button(favorite.symbol, key=f"fav_{favorite.symbol}"):
-                    select_action(favorite.symbol)
-
-        with col2:
-            st.header("Notícias")
-            
-            news_articles = [
-                {"source": "BANCO DO BRASIL", "title": "BBAS3.SA", "summary": "O Banco do Brasil foi a primeira instituição financeira do Brasil, e atualmente é considerado um dos maiores bancos do país.", "time": "32 min ago", "stars": 3},
-                {"source": "PETROBRAS", "title": "PETR4.SA", "summary": "A Petrobras é uma empresa petrolífera brasileira. Ela se dedica à exploração, produção, refino, transporte e comercialização de petróleo e seus derivados, além do gás natural.", "time": "43 min ago", "stars": 2},
-                {"source": "VALE", "title": "VALE3.SA", "summary": "A Vale é uma multinacional brasileira líder na mineração e produção de minério de ferro e níquel, com operações globais e foco em sustentabilidade e inovação.", "time": "41 min ago", "stars": 2},
-                {"source": "APPLE", "title": "AAPL", "summary": "A Apple é uma multinacional americana inovadora, conhecida por seus produtos eletrônicos icônicos como o iPhone, iPad e Mac, além de serviços digitais avançados.", "time": " 44 min ago", "stars": 5},
-                {"source": "TESLA", "title": "TSLA", "summary": "A Tesla é uma empresa americana pioneira em veículos elétricos, energia sustentável e tecnologias de condução autônoma, com um impacto significativo no setor automotivo global.", "time": "45 min ago", "stars": 2},
-            ]
-
-            def render_stars(num_stars):
-                return "⭐" * num_stars
-
-            for article in news_articles:
-                st.markdown(
-                    f"""
-                    <div class="news-card">
-                        <div class="news-header">
-                            <h4>{article['source']}</h4>
-                            <span class="time">{article['time']}</span>
-                        </div>
-                        <div class="news-content">
-                            <p><strong>{article['title']}</strong></p>
-                            <p>{article['summary']}</p>
-                        </div>
-                        <div class="news-footer">
-                            <span class="stars">{render_stars(article['stars'])}</span>
-                        </div>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-            st.markdown(
-                """
-                <div style="text-align: center; margin-top: 1rem;">
-                    <a href="#" style="color: #fff; text-decoration: none;">See All</a>
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
-
-    elif page == "Notícias":
-        st.session_state.page = "Notícias"
-        st.title("Notícias")
-        
-        news_articles = [
-            {"source": "INFOMONEY", "title": "VALE3.SA", "summary": "Vale eleva em 2,4% produção de minério de ferro no 2º trimestre", "time": "17 horas", "stars": 5},
-            {"source": "FINANCE NEWS", "title": "VALE3.SA", "summary": "produção de minério de ferro alcança 80,5 milhões de toneladas no 2T24", "time": "17 horas", "stars": 5},
-            {"source": "ODIA", "title": "PETR4.SA", "summary": "Aumento da Petrobras puxa alta de 1,16% na gasolina na primeira quinzena de julho", "time": "1 dia", "stars": 1},
-            {"source": "SEU DINHEIRO", "title": "VALE3.SA", "summary": "Vale (VALE3) perde quase R$ 7 bilhões em valor de mercado e relatório de produção vem aí — mineradora pode ter mais de um vilão no 2T24", "time": "21 horas", "stars": 1},
-            {"source": "MONEYTIMES", "title": "PETR4.SA", "summary": "Etanol: Preços saltam mais de 5% no mercado à vista após reajuste da gasolina pela Petrobras (PETR4)", "time": "1 dia", "stars": 2},
-            {"source": "The New York Times", "title": "Product #B", "summary": "Lorem ipsum dolor sit amet, consectetur adipiscing elit.", "time": "5 min ago", "stars": 4},
-            {"source": "Reuters", "title": "Product #C", "summary": "Lorem ipsum dolor sit amet, consectetur adipiscing elit.", "time": "7 min ago", "stars": 5},
-            {"source": "Valor Econômico", "title": "Product #D", "summary": "Lorem ipsum dolor sit amet, consectetur adipiscing elit.", "time": "9 min ago", "stars": 5},
-            {"source": "forbes", "title": "Product #A", "summary": "Lorem ipsum dolor sit amet, consectetur adipiscing elit.", "time": "2 min ago", "stars": 5},
-            {"source": "The New York Times", "title": "Product #B", "summary": "Lorem ipsum dolor sit amet, consectetur adipiscing elit.", "time": "5 min ago", "stars": 4},
-            {"source": "Reuters", "title": "Product #C", "summary": "Lorem ipsum dolor sit amet, consectetur adipiscing elit.", "time": "7 min ago", "stars": 5},
-            {"source": "Valor Econômico", "title": "Product #D", "summary": "Lorem ipsum dolor sit amet, consectetur adipiscing elit.", "time": "9 min ago", "stars": 5},
-    
-        ]
-
-        def render_stars(num_stars):
-            return "⭐" * num_stars
-
-        for article in news_articles:
-            st.markdown(
-                f"""
-                <div class="news-card">
-                    <div class="news-header">
-                        <h4>{article['source']}</h4>
-                        <span class="time">{article['time']}</span>
-                    </div>
-                    <div class="news-content">
-                        <p><strong>{article['title']}</strong></p>
-                        <p>{article['summary']}</p>
-                    </div>
-                    <div class="news-footer">
-                        <span class="stars">{render_stars(article['stars'])}</span>
-                    </div>
-                </div>
-                """,
-                unsafe_allow_html=True
-            )
-        st.markdown(
-            """
-            <div style="text-align: center; margin-top: 1rem;">
-                <a href="#" style="color: #fff; text-decoration: none;">See All</a>
-            </div>
-            """,
-            unsafe_allow_html=True
-        )
-
-    elif page == "Ações":
-        st.session_state.page = "Ações"
-        st.title("Ações")
-        st.header(st.session_state.selected_action)
-        
-        # Dropdown para selecionar outra ação
-        available_actions = ["BBAS3.SA", "PETR4.SA", "VALE3.SA", "AAPL", "TSLA"]
-        new_action = st.selectbox("Selecione uma ação", available_actions, index=available_actions.index(st.session_state.selected_action))
-        if new_action != st.session_state.selected_action:
-            select_action(new_action)
-            st.experimental_rerun()
-        
-        # Obter dados da ação
-        render_stock_data(new_action)
-        
-        # Previsão de preços
-        n_days = st.slider('Quantidade de dias de previsão', 30, 90)
-        render_price_forecast(new_action, n_days)
-
-
+    # As dependências pesadas são carregadas em segundo plano enquanto a primeira página é exibida
+    startup.prewarm()
+
+    # Cada renderização de página é medida e gravada em config.METRICS_FILE
+    with perf.page_render(page):
+        if page == "Página Inicial":
+            home_page()
+        elif page == "Notícias":
+            news_page()
+        elif page == "Ações":
+            stocks_page()
+        elif page == "Carteira":
+            portfolio_page()
+
+    if st.session_state.username in config.ADMIN_USERS and st.sidebar.checkbox("Painel de desempenho"):
+        admin_panel()
@@ -0,0 +1,41 @@
+import importlib
+import threading
+
+import config
+
+# Abertura rápida do site: as dependências pesadas (Prophet/cmdstanpy, yfinance) só são importadas no primeiro uso.
+# O plotly continua importado no início (site2, charts, downsampling, forecast_plots), mas os validadores de cada tipo
+# de traço só são carregados na primeira figura. Depois do login, prewarm() carrega tudo isso em segundo plano, junto
+# com os processos de previsão, para que a primeira página que os usa não pague esse custo.
+
+# Módulos carregados em segundo plano, na ordem
+HEAVY_MODULES = ['plotly.graph_objects', 'plotly.subplots', 'prophet', 'prophet.serialize']
+
+_lock = threading.Lock()
+_started = False
+
+
+# Função executada na thread de aquecimento
+def _prewarm():
+    modules = HEAVY_MODULES + (['yfinance'] if config.MARKET_DATA_PROVIDER == 'yfinance' else [])
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+    # Os validadores de cada tipo de traço do plotly só são carregados na primeira figura
+    import plotly.graph_objects as go
+    go.Figure([go.Scatter(), go.Scattergl(), go.Bar(), go.Candlestick(), go.Heatmap()])
+
+    import forecast_worker
+    forecast_worker.prewarm()
+
+
+# Função para aquecer as dependências pesadas em segundo plano (uma única vez por processo)
+def prewarm():
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+    threading.Thread(target=_prewarm, name='prewarm', daemon=True).start()
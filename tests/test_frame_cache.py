@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import config
+import frame_cache
+
+
+# Cache vazio em cada teste
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(frame_cache, '_entries', frame_cache.OrderedDict())
+    monkeypatch.setattr(frame_cache, '_total_bytes', 0)
+
+
+# DataFrame com colunas de tipos diferentes, como o histórico de preços
+def history():
+    index = pd.DatetimeIndex(['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05'], name='Date')
+    return pd.DataFrame({'Close': np.arange(5.0), 'Volume': np.arange(5) * 100}, index=index)
+
+
+# As sessões recebem os mesmos dados, sem cópia
+def test_views_share_data():
+    frame_cache.put(('history', 'A'), history())
+    a, b = frame_cache.get(('history', 'A')), frame_cache.get(('history', 'A'))
+    assert np.shares_memory(a['Close'].to_numpy(), b['Close'].to_numpy())
+    pd.testing.assert_frame_equal(a, history())
+
+
+# Alterações feitas por uma sessão copiam os dados e não chegam ao cache nem às outras sessões
+@pytest.mark.parametrize('write', [
+    lambda df: df.iloc.__setitem__((0, 0), 99.0),
+    lambda df: df.loc.__setitem__((slice(None), 'Volume'), 7),
+    lambda df: df.__setitem__('Close', 0.0),
+    lambda df: df.reset_index(inplace=True),
+])
+def test_writes_copy_on_write(write):
+    frame_cache.put(('history', 'A'), history())
+    outra = frame_cache.get(('history', 'A'))
+    write(frame_cache.get(('history', 'A')))
+    pd.testing.assert_frame_equal(frame_cache.get(('history', 'A')), history())
+    pd.testing.assert_frame_equal(outra, history())
+
+
+# Um DataFrame já entregue continua válido (e alterável) depois que a entrada é descartada
+def test_view_survives_eviction(monkeypatch):
+    monkeypatch.setattr(config, 'FRAME_CACHE_BUDGET_MB', 0)
+    df = frame_cache.put(('history', 'A'), history())
+    assert frame_cache.stats()['entries'] == 0
+    df.iloc[0, 0] = 99.0
+    assert df.iloc[0, 0] == 99.0
+
+
+# Colunas de tipos de extensão (str, category, Int64) são guardadas com o tipo original e também copiadas na escrita
+def test_extension_dtypes():
+    df = history()
+    df['Symbol'] = pd.Series(['A', 'B', 'A', 'B', 'A'], index=df.index, dtype='str')
+    df['Setor'] = pd.Categorical(['x', 'y', 'x', 'y', 'x'])
+    df['Negocios'] = pd.array([1, None, 3, 4, 5], dtype='Int64')
+    frame_cache.put(('history', 'A'), df)
+    cached = frame_cache.get(('history', 'A'))
+    pd.testing.assert_frame_equal(cached, df)
+    cached.loc[df.index[0], 'Symbol'] = 'Z'
+    pd.testing.assert_frame_equal(frame_cache.get(('history', 'A')), df)
+    assert frame_cache.stats()['bytes'] > 0
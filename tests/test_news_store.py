@@ -0,0 +1,64 @@
+import pytest
+
+import news_sources
+import news_store
+
+
+# Fonte de notícias controlada pelo teste: devolve `artigos` para qualquer ativo ou falha enquanto `falhar` for verdadeiro
+class FakeSource(news_sources.NewsSource):
+    name = 'fake'
+
+    def __init__(self, artigos):
+        self.artigos = artigos
+        self.falhar = False
+
+    def fetch(self, symbol):
+        if self.falhar:
+            raise ConnectionError("sem rede")
+        return self.artigos
+
+
+# Banco de notícias vazio em um diretório temporário e a fonte falsa em cada teste
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    monkeypatch.setattr(news_store, 'NEWS_DB', str(tmp_path / 'news.db'))
+    monkeypatch.setattr(news_store, '_initialized', False)
+    monkeypatch.setattr(news_store, '_last_refresh', {})
+    anterior = news_sources._source
+    fake = FakeSource([])
+    news_sources.set_source(fake)
+    yield fake
+    news_sources.set_source(anterior)
+
+
+# Artigo no formato devolvido pelas fontes
+def article(title, url):
+    return {'symbol': 'AAPL', 'published': '2026-10-01T10:00:00', 'source': 'Teste', 'title': title, 'summary': '', 'url': url}
+
+
+# Uma falha na busca feita na hora não esconde as notícias até passar REFRESH_INTERVAL
+def test_failed_synchronous_ingest_can_be_retried(source):
+    source.artigos = [article('Apple sobe', 'https://example.com/a')]
+    source.falhar = True
+    with pytest.raises(ConnectionError):
+        news_store.refresh(['AAPL'])
+    source.falhar = False
+    news_store.refresh(['AAPL'])
+    artigos, total = news_store.query(['AAPL'])
+    assert total == 1
+
+
+# Só links http(s) são gravados
+def test_ingest_drops_non_http_urls(source):
+    source.artigos = [
+        article('Link seguro', 'https://example.com/a'),
+        article('Link com script', 'javascript:alert(1)'),
+        article('Link com dados', 'data:text/html,<script>alert(1)</script>'),
+    ]
+    news_store.ingest(['AAPL'])
+    artigos, _ = news_store.query(['AAPL'])
+    assert {a['title']: a['url'] for a in artigos} == {
+        'Link seguro': 'https://example.com/a',
+        'Link com script': None,
+        'Link com dados': None,
+    }
@@ -0,0 +1,43 @@
+import json
+
+import config
+import perf
+
+
+# Lê os registros de página gravados no arquivo de métricas
+def records(path):
+    with open(path, encoding='utf-8') as f:
+        return {r['page']: r for r in map(json.loads, f) if r['type'] == 'page'}
+
+
+# Um fragmento renderizado dentro da página não pode levar embora as medições feitas depois dele
+def test_nested_page_render_restores_outer_render(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'METRICS_FILE', str(tmp_path / 'metrics.jsonl'))
+    with perf.page_render('Ações'):
+        perf.count('antes')
+        with perf.page_render('Ações (ao vivo)'):
+            perf.count('fragmento')
+        perf.count('depois')
+        with perf.span('previsao'):
+            pass
+
+    paginas = records(config.METRICS_FILE)
+    assert paginas['Ações']['counters'] == {'antes': 1, 'depois': 1}
+    assert [s['name'] for s in paginas['Ações']['spans']] == ['previsao']
+    assert paginas['Ações (ao vivo)']['counters'] == {'fragmento': 1}
+    assert perf._current() is None
+
+
+# O arquivo de métricas é rotacionado ao passar do limite, e a leitura junta o arquivo atual com o anterior
+def test_metrics_file_rotates_and_reads_tail(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'METRICS_FILE', str(tmp_path / 'metrics.jsonl'))
+    monkeypatch.setattr(config, 'METRICS_MAX_BYTES', 4096)
+    for i in range(200):
+        with perf.page_render(f'p{i}'):
+            pass
+
+    assert (tmp_path / 'metrics.jsonl.1').exists()
+    assert (tmp_path / 'metrics.jsonl').stat().st_size < 4096
+    ultimos = perf.load_page_records(limit=30)
+    assert [r['page'] for r in ultimos] == [f'p{i}' for i in range(170, 200)]
+    assert len(perf.load_page_records(limit=10**6)) < 200
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import forecast_engines
+import portfolio
+
+
+# Fechamentos de dois ativos: um com histórico longo e outro que acabou de começar a ser negociado
+def closes():
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range('2025-01-01', periods=60)
+    novo = np.full(60, np.nan)
+    novo[-4:] = [10.0, 10.5, 10.2, 10.4]
+    return pd.DataFrame({'LONGO': 100 + rng.normal(0, 1, 60).cumsum(), 'NOVO': novo}, index=index)
+
+
+# Os motores rápidos não falham com históricos curtos: o ativo fica de fora da tabela
+@pytest.mark.parametrize('engine', ['holt_winters', 'arima', 'naive'])
+def test_batch_forecast_skips_series_shorter_than_engine_minimum(engine):
+    prontas, pendentes = portfolio.batch_forecast(closes(), 30, engine)
+    assert list(prontas) == ['LONGO']
+    assert pendentes == {}
+
+
+# Cada motor prevê com exatamente o mínimo de pregões que declara
+@pytest.mark.parametrize('engine', ['holt_winters', 'arima', 'naive'])
+def test_engines_forecast_at_minimum_length(engine):
+    motor = forecast_engines.get_engine(engine)
+    rng = np.random.default_rng(1)
+    df = pd.DataFrame({'ds': pd.bdate_range('2025-01-01', periods=motor.min_rows), 'y': 100 + rng.normal(0, 1, motor.min_rows).cumsum()})
+    previsao = motor.forecast(df, 30)
+    assert previsao['yhat'].notna().all()
+
+
+# Uma janela sem retornos suficientes devolve um resumo vazio em vez de falhar
+@pytest.mark.parametrize('pregoes', [1, 2])
+def test_risk_summary_without_enough_returns_is_empty(pregoes):
+    risco = portfolio.risk_summary(portfolio.align_returns(closes().iloc[:pregoes]))
+    assert risco['ativos'].empty
+    assert np.isnan(risco['volatilidade']) and np.isnan(risco['var_historico'])
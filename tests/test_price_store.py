@@ -0,0 +1,164 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import config
+import market_data
+import price_store
+
+
+# Banco de preços vazio em um diretório temporário para cada teste
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(price_store, 'PRICES_DB', str(tmp_path / 'prices.db'))
+    monkeypatch.setattr(price_store, '_initialized', False)
+    monkeypatch.setattr(price_store, '_versions', {})
+    monkeypatch.setattr(price_store, '_last_refresh', {})
+    return tmp_path / 'prices.db'
+
+
+# Pregões sintéticos em dias úteis, com fechamento crescente e volume fixo
+def bars(start, end):
+    index = pd.bdate_range(start, end)
+    close = 100 + np.arange(len(index), dtype=float)
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1, 'Close': close, 'Volume': 1000}, index=index)
+
+
+# Ativo gravado antes da tabela rollups: a primeira atualização não pode deixar de fora os anos anteriores
+def test_rollups_backfilled_for_pre_upgrade_store(store):
+    antigo = bars('2021-01-04', '2025-12-31')
+    conn = sqlite3.connect(store)
+    conn.execute(
+        "CREATE TABLE prices (symbol TEXT NOT NULL, date TEXT NOT NULL, open REAL, high REAL, low REAL, close REAL,"
+        " volume INTEGER, PRIMARY KEY (symbol, date)) WITHOUT ROWID"
+    )
+    conn.executemany(
+        "INSERT INTO prices VALUES ('TEST', ?, ?, ?, ?, ?, ?)",
+        [(d.strftime('%Y-%m-%d'), r.Open, r.High, r.Low, r.Close, int(r.Volume)) for d, r in antigo.iterrows()],
+    )
+    conn.commit()
+    conn.close()
+
+    novo = bars('2026-01-01', '2026-03-31')
+    price_store.save_bars('TEST', novo)
+
+    mensal = price_store.load_rollup('TEST', 'M')
+    assert mensal.index[0] == pd.Timestamp('2021-01-01')
+    assert mensal['Volume'].sum() == 1000 * (len(antigo) + len(novo))
+    anual = price_store.load_rollup('TEST', 'Y')
+    assert list(anual.index.year) == [2021, 2022, 2023, 2024, 2025, 2026]
+
+
+# Gravações incrementais mantêm as agregações iguais às calculadas do zero
+def test_incremental_rollups_match_full_rebuild(store):
+    price_store.save_bars('TEST', bars('2024-01-01', '2025-06-30'))
+    price_store.save_bars('TEST', bars('2025-06-30', '2025-09-30'))
+    incremental = price_store.load_rollup('TEST', 'W')
+    with price_store._connect() as conn:
+        conn.execute("DELETE FROM rollups")
+        price_store._update_rollups(conn, 'TEST')
+    pd.testing.assert_frame_equal(incremental, price_store.load_rollup('TEST', 'W'))
+
+
+# Fonte de dados controlada pelo teste: devolve `frames` (recortados em start) ou falha enquanto `falhar` for verdadeiro
+class FakeProvider(market_data.MarketDataProvider):
+    name = 'fake'
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.falhar = False
+        self.chamadas = []
+
+    def history(self, symbol, start):
+        self.chamadas.append(str(pd.Timestamp(start).date()))
+        if self.falhar:
+            raise ConnectionError("sem rede")
+        df = self.frames[symbol]
+        return df[df.index >= pd.Timestamp(start)]
+
+    def info(self, symbol):
+        return {}
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    fake = FakeProvider({})
+    monkeypatch.setattr(market_data, '_provider', fake)
+    return fake
+
+
+# Uma busca que falhou pode ser repetida na hora, sem esperar REFRESH_INTERVAL
+@pytest.mark.parametrize('refresh', [price_store.refresh, lambda symbol: price_store.refresh_many([symbol])])
+def test_failed_refresh_can_be_retried(store, provider, refresh):
+    provider.frames['TEST'] = bars(config.DATA_INICIO, '2026-03-31')
+    provider.falhar = True
+    with pytest.raises(ConnectionError):
+        refresh('TEST')
+    provider.falhar = False
+    refresh('TEST')
+    assert price_store.last_stored_date('TEST') is not None
+
+
+# Um dividendo novo no trecho baixado faz o histórico inteiro ser baixado de novo, já com o novo ajuste
+def test_new_dividend_refetches_full_history(store, provider):
+    antigo = bars(config.DATA_INICIO, '2026-03-02')
+    price_store.save_bars('TEST', antigo)
+
+    reajustado = bars(config.DATA_INICIO, '2026-03-31')
+    reajustado[['Open', 'High', 'Low', 'Close']] *= 0.9
+    reajustado['Dividends'] = 0.0
+    reajustado.loc['2026-03-16', 'Dividends'] = 1.5
+    reajustado['Stock Splits'] = 0.0
+    provider.frames['TEST'] = reajustado
+
+    price_store.refresh('TEST', force=True)
+    assert provider.chamadas == ['2026-03-02', pd.Timestamp(config.DATA_INICIO).date().isoformat()]
+    hist = price_store.load_history('TEST')
+    np.testing.assert_allclose(hist['Close'].to_numpy(), reajustado['Close'].to_numpy())
+
+
+# Sem eventos novos, só o trecho que falta é baixado
+def test_refresh_without_actions_fetches_only_the_tail(store, provider):
+    price_store.save_bars('TEST', bars(config.DATA_INICIO, '2026-03-02'))
+    novo = bars(config.DATA_INICIO, '2026-03-31')
+    novo['Dividends'] = 0.0
+    novo['Stock Splits'] = 0.0
+    provider.frames['TEST'] = novo
+    price_store.refresh('TEST', force=True)
+    assert provider.chamadas == ['2026-03-02']
+
+
+# O pregão de hoje ainda está em aberto: cada atualização depois de REFRESH_INTERVAL traz o preço mais recente
+@pytest.mark.parametrize('refresh', [price_store.refresh, lambda symbol: price_store.refresh_many([symbol])])
+def test_todays_bar_is_refetched(store, provider, monkeypatch, refresh):
+    monkeypatch.setattr(price_store, 'REFRESH_INTERVAL', 0)
+    hoje = pd.Timestamp.today().normalize()
+    frame = bars(hoje - pd.Timedelta(days=20), hoje - pd.Timedelta(days=1))
+    frame.loc[hoje] = {'Open': 10.0, 'High': 10.0, 'Low': 10.0, 'Close': 10.0, 'Volume': 1000}
+    provider.frames['TEST'] = frame
+    refresh('TEST')
+    assert price_store.load_history('TEST')['Close'].iloc[-1] == 10
+
+    frame.loc[hoje, ['High', 'Close']] = 20.0
+    refresh('TEST')
+    assert provider.chamadas[-1] == hoje.date().isoformat()
+    assert price_store.load_history('TEST')['Close'].iloc[-1] == 20
+    assert price_store.load_quotes(['TEST']).loc['TEST', 'last'] == 20
+
+
+# O gráfico ao vivo recebe só as últimas cotações do dia, recomeçando a cada dia
+def test_live_ticks_are_bounded_and_reset_daily(monkeypatch):
+    monkeypatch.setattr(price_store, '_live_bars', {})
+    monkeypatch.setattr(price_store, '_live_ticks', {})
+    monkeypatch.setattr(price_store, 'LIVE_MAX_TICKS', 3)
+    ontem = pd.Timestamp('2026-03-02 16:00')
+    price_store.push_tick('TEST', {'time': ontem, 'price': 9.0, 'volume': 100})
+    for i in range(5):
+        price_store.push_tick('TEST', {'time': ontem + pd.Timedelta(days=1, minutes=i), 'price': 10.0 + i, 'volume': 100 + i})
+    times, prices = price_store.live_ticks('TEST')
+    assert prices == [12.0, 13.0, 14.0]
+    assert times[-1] == ontem + pd.Timedelta(days=1, minutes=4)
+    bar = price_store.live_bar('TEST')
+    assert (bar['Open'], bar['Low'], bar['High'], bar['ticks']) == (10.0, 10.0, 14.0, 5)